@@ -1,18 +1,12 @@
 # apply_horse_ratings_to_pf_betfair.py
 # Join per-horse ratings onto PF+Betfair merged data by horse_name_norm only (no date overlap needed).
 import os, re, pandas as pd
+from text_utils import norm_txt_series
 
 MERGED_IN  = r"data/processed/ml/pf_betfair_merged.csv.gz"
 RATINGS_IN = r"artifacts/horse_ratings_2021.csv"
 OUT_PATH   = r"data/processed/ml/pf_betfair_with_kagglepriors.csv.gz"
 
-def norm(s):
-    import pandas as pd, re
-    if pd.isna(s): return s
-    s = str(s).lower().strip()
-    s = re.sub(r"[^\w\s]", "", s); s = re.sub(r"\s+", " ", s)
-    return s
-
 if not os.path.exists(MERGED_IN):
     raise SystemExit("❌ PF+Betfair merged file not found: "+MERGED_IN)
 if not os.path.exists(RATINGS_IN):
@@ -32,7 +26,7 @@ def pick(cols, pats):
 
 horse_col = pick(df.columns, [r"horse_name_norm", r"horse.?name", r"runner.?name", r"selection_name"])
 if horse_col != "horse_name_norm":
-    df["horse_name_norm"] = df[horse_col].map(norm)
+    df["horse_name_norm"] = norm_txt_series(df[horse_col])
 # Ratings already have horse_name_norm
 enriched = df.merge(rt[["horse_name_norm","horse_rating_2021","runs_life","win_rate_life","model_prob"]],
                     on="horse_name_norm", how="left")
@@ -4,18 +4,12 @@ import os, re, zipfile, io, pandas as pd, numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score
 import lightgbm as lgb
+from text_utils import norm_txt_series
 
 ARCH = "archive.zip"
 OUT_PATH = os.path.join("artifacts", "horse_ratings_2021.csv")
 os.makedirs("artifacts", exist_ok=True)
 
-def norm(s):
-    if pd.isna(s): return s
-    s = str(s).lower().strip()
-    s = re.sub(r"[^\w\s]", "", s)
-    s = re.sub(r"\s+", " ", s)
-    return s
-
 # 1) Find a runner-level Kaggle CSV (usually field.csv) inside archive.zip
 with zipfile.ZipFile(ARCH, "r") as z:
     candidates = [i for i in z.infolist() if i.filename.lower().endswith(".csv")]
@@ -66,7 +60,7 @@ kg = kg[kg_year <= 2021].copy()
 if len(kg) == 0:
     raise SystemExit("❌ No Kaggle rows ≤ 2021 after filtering.")
 
-kg["horse_name_norm"] = kg[horse_col].map(norm)
+kg["horse_name_norm"] = norm_txt_series(kg[horse_col])
 
 # 4) Create simple targets & features
 # Target: win (place==1) if available; otherwise use finishing position proxy
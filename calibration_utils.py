@@ -0,0 +1,36 @@
+"""Probability calibration and scoring shared by the walk-forward trainers."""
+from __future__ import annotations
+
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+
+
+def fit_isotonic(cal_probs, cal_y) -> IsotonicRegression:
+    """Fit a monotone map from raw model probabilities to observed win rates.
+
+    One pool-adjacent-violators pass over the held-out rows (O(N log N) for the
+    sort) - no cross-validation or estimator cloning. Inputs outside the fitted
+    range are clipped to its end points.
+    """
+    iso = IsotonicRegression(out_of_bounds="clip")
+    iso.fit(np.asarray(cal_probs, dtype=float), np.asarray(cal_y, dtype=float))
+    return iso
+
+
+def apply_isotonic(iso: IsotonicRegression, probs) -> np.ndarray:
+    """Calibrate raw probabilities with a map from :func:`fit_isotonic`."""
+    return iso.predict(np.asarray(probs, dtype=float))
+
+
+def binary_log_loss(y, prob) -> float:
+    """sklearn's log_loss for 0/1 labels, without its validation and label binarisation passes.
+
+    Probabilities are clipped by the machine epsilon of their own dtype, as sklearn does,
+    so float32 scores are scored without first being widened.
+    """
+    prob = np.asarray(prob)
+    if not np.issubdtype(prob.dtype, np.floating):
+        prob = prob.astype(float)
+    eps = np.finfo(prob.dtype).eps
+    prob = np.clip(prob, eps, 1 - eps)
+    return float(-np.mean(np.where(np.asarray(y) == 1, np.log(prob), np.log1p(-prob))))
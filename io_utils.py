@@ -0,0 +1,47 @@
+"""Feature loading and artifact writes shared by the walk-forward trainers."""
+from __future__ import annotations
+
+import os
+import re
+
+import pandas as pd
+
+
+def atomic_replace(path, write) -> None:
+    """Run write(tmp) on a sibling temp file, then os.replace it over path.
+
+    An interrupted run leaves the previous artifact intact instead of a truncated one.
+    """
+    tmp = f"{os.fspath(path)}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)  # atomic on POSIX: readers see the old file or the new one
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def atomic_to_csv(frame: pd.DataFrame, path, **kwargs) -> None:
+    atomic_replace(path, lambda tmp: frame.to_csv(tmp, **kwargs))
+
+
+def load_features(csv_path, columns=None) -> pd.DataFrame:
+    """Read the features CSV through a parquet sidecar, rebuilt whenever the CSV is newer.
+
+    The sidecar sits beside the CSV with the .csv / .csv.gz suffix swapped for .parquet.
+    """
+    csv_path = os.fspath(csv_path)
+    pq_path = re.sub(r"\.csv(\.gz)?$", "", csv_path) + ".parquet"
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(csv_path):
+        return pd.read_parquet(pq_path, columns=columns)
+    try:
+        frame = pd.read_csv(csv_path, engine="pyarrow")  # multi-threaded parse
+    except ValueError:
+        # pyarrow rejects columns whose type changes part-way through; the C parser copes
+        frame = pd.read_csv(csv_path, low_memory=False)
+    try:
+        atomic_replace(pq_path, lambda tmp: frame.to_parquet(tmp, index=False))
+    except (ValueError, TypeError, ImportError, OSError) as exc:
+        print(f"Skipping parquet sidecar for {csv_path}: {exc}")
+    return frame[columns] if columns else frame
@@ -1,12 +1,6 @@
 # merge_pf_to_betfair_bulk.py — merge PF Starter (form) with Betfair for all months
 import os, re, glob, json, ast, numpy as np, pandas as pd
-
-def norm(s):
-    if pd.isna(s): return s
-    s = str(s).lower().strip()
-    s = re.sub(r"[^\w\s]", "", s)
-    s = re.sub(r"\s+", " ", s)
-    return s
+from text_utils import norm_txt_series
 
 PROC = os.path.join("data","processed","puntingform")
 OUT  = os.path.join("data","processed","ml","pf_betfair_merged.csv.gz")
@@ -83,12 +77,12 @@ if not venue_col:
     raise SystemExit(f"❌ PF track column not found. Evaluated columns: {list(pf.columns)[:10]}")
 
 pf["event_date"] = pd.to_datetime(pf[date_col], errors="coerce")
-pf["track_name_norm"] = pf[venue_col].map(norm)
+pf["track_name_norm"] = norm_txt_series(pf[venue_col])
 if "forms" in pf.columns:
-    pf["_track_from_forms_norm"] = pf["forms"].apply(extract_track_from_forms).map(norm)
+    pf["_track_from_forms_norm"] = norm_txt_series(pf["forms"].apply(extract_track_from_forms))
     pf["track_name_norm"] = pf["track_name_norm"].fillna(pf["_track_from_forms_norm"])
     pf.drop(columns=["_track_from_forms_norm"], inplace=True)
-pf["horse_name_norm"] = pf[horse_col].map(norm)
+pf["horse_name_norm"] = norm_txt_series(pf[horse_col])
 if dist_col:
     pf["distance"] = pd.to_numeric(pf[dist_col], errors="coerce")
 
@@ -130,10 +124,10 @@ for y in years:
         except Exception:
             bf["event_date"] = pd.to_datetime(dt, errors="coerce").dt.normalize()
 
-    bf["track_name_norm"] = bf[ev_name].map(norm) if ev_name in bf.columns else np.nan
+    bf["track_name_norm"] = norm_txt_series(bf[ev_name]) if ev_name in bf.columns else np.nan
     if "track" in bf.columns:
-        bf["track_name_norm"] = bf["track_name_norm"].fillna(bf["track"].map(norm))
-    bf["horse_name_norm"] = bf[run_name].map(norm) if run_name in bf.columns else np.nan
+        bf["track_name_norm"] = bf["track_name_norm"].fillna(norm_txt_series(bf["track"]))
+    bf["horse_name_norm"] = norm_txt_series(bf[run_name]) if run_name in bf.columns else np.nan
     # choose odds (bsp preferred)
     bf["odds"] = pd.to_numeric(bf[bsp], errors="coerce") if bsp in bf.columns else pd.to_numeric(bf[lpt], errors="coerce")
 
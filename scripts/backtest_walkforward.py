@@ -8,8 +8,8 @@ from typing import Iterable
 
 import numpy as np
 import pandas as pd
-from lightgbm import LGBMClassifier
-from sklearn.metrics import log_loss, roc_auc_score
+import lightgbm as lgb
+from sklearn.metrics import roc_auc_score
 
 import sys
 
@@ -17,7 +17,9 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
+from calibration_utils import binary_log_loss
 from feature_engineering import engineer_all_features, get_feature_columns
+from io_utils import load_features
 from services.api.pf_schema_loader import load_pf_dataset
 
 DATA_PATH = Path("data/processed/ml/betfair_kash_top5.csv.gz")
@@ -30,29 +32,35 @@ MIN_TRAIN_ROWS = 50_000  # skip very early months if not enough history
 
 MODEL_PARAMS = dict(
     objective="binary",
-    n_estimators=500,
     learning_rate=0.03,
     num_leaves=63,
     subsample=0.9,
     colsample_bytree=0.8,
     random_state=42,
+    verbose=-1,
 )
+NUM_BOOST_ROUND = 500
 
 
-def compute_metrics(df: pd.DataFrame, margins: Iterable[float]) -> list[dict[str, float]]:
+def compute_metrics(
+    model_prob: np.ndarray,
+    win_odds: np.ndarray,
+    won: np.ndarray,
+    margins: Iterable[float],
+) -> list[dict[str, float]]:
+    # Plain arrays: each margin is one comparison and one gather, no frame copies
     results: list[dict[str, float]] = []
-    implied = 1.0 / (df["win_odds"] + 1e-9)
-    won = df["won"].values
+    implied = 1.0 / (win_odds + 1e-9)
+    returns = np.where(won == 1, win_odds - 1.0, -1.0)
 
     for margin in margins:
-        edge_mask = df["model_prob"] > implied * margin
-        bets = df[edge_mask]
+        edge_mask = model_prob > implied * margin
         num_bets = int(edge_mask.sum())
         if num_bets == 0:
             pot = 0.0
             profit = 0.0
         else:
-            profits = np.where(bets["won"] == 1, bets["win_odds"] - 1.0, -1.0)
+            profits = returns[edge_mask]
             profit = float(profits.sum())
             pot = float(profits.mean())
         results.append(
@@ -71,7 +79,7 @@ def main() -> None:
     if df_raw is None or df_raw.empty:
         if not DATA_PATH.exists():
             raise SystemExit(f"❌ Dataset missing: {DATA_PATH}")
-        df_raw = pd.read_csv(DATA_PATH)
+        df_raw = load_features(DATA_PATH)
     df = engineer_all_features(df_raw)
 
     df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
@@ -98,21 +106,23 @@ def main() -> None:
         if len(X_train) < MIN_TRAIN_ROWS or len(X_test) == 0:
             continue
 
-        model = LGBMClassifier(**MODEL_PARAMS)
-        model.fit(X_train, y_train)
+        # Native booster: skips the sklearn wrapper's label encoding and predict_proba stacking
+        booster = lgb.train(MODEL_PARAMS, lgb.Dataset(X_train, y_train), num_boost_round=NUM_BOOST_ROUND)
 
-        train_pred = model.predict_proba(X_train)[:, 1]
-        test_pred = model.predict_proba(X_test)[:, 1]
+        train_pred = booster.predict(X_train)
+        test_pred = booster.predict(X_test)
 
-        train_logloss = log_loss(y_train, train_pred)
-        test_logloss = log_loss(y_test, test_pred)
+        train_logloss = binary_log_loss(y_train, train_pred)
+        test_logloss = binary_log_loss(y_test, test_pred)
         train_auc = roc_auc_score(y_train, train_pred)
         test_auc = roc_auc_score(y_test, test_pred)
 
-        test_frame = df.loc[test_mask, ["win_odds", "won"]].copy()
-        test_frame["model_prob"] = test_pred
-
-        bet_metrics = compute_metrics(test_frame, MARGIN_FACTORS)
+        bet_metrics = compute_metrics(
+            test_pred,
+            df.loc[test_mask, "win_odds"].to_numpy(dtype=float),
+            y_test.to_numpy(),
+            MARGIN_FACTORS,
+        )
         for bm in bet_metrics:
             rows.append(
                 dict(
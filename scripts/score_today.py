@@ -22,6 +22,7 @@ import pandas as pd
 from lightgbm import Booster
 
 from feature_engineering import engineer_all_features, get_feature_columns
+from io_utils import load_features
 from services.api.pf_schema_loader import load_pf_dataset
 from betfair_live import fetch_live_markets
 
@@ -43,7 +44,7 @@ def load_dataset(target_date: date) -> pd.DataFrame:
     if df is None or df.empty:
         if not DATA_PATH.exists():
             raise SystemExit(f"❌ Dataset missing: {DATA_PATH}")
-        df = pd.read_csv(DATA_PATH)
+        df = load_features(DATA_PATH)
         df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
         df = df.dropna(subset=["event_date"]).copy()
     mask = df["event_date"].dt.date == target_date
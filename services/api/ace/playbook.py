@@ -7,14 +7,14 @@ import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from statistics import NormalDist
 from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
 try:
-    from scipy.stats import binomtest
-    from statsmodels.stats.proportion import proportion_confint
+    from scipy.stats import binom
     STATS_AVAILABLE = True
 except ImportError:
     STATS_AVAILABLE = False
@@ -186,39 +186,31 @@ class ACEReflector:
             DataFrame with added columns: p_value, hit_rate_ci_low, hit_rate_ci_high
         """
         if not STATS_AVAILABLE:
-            # If scipy/statsmodels not available, skip statistical tests
+            # If scipy not available, skip statistical tests
             return df
 
         df = df.copy()
-        p_values = []
-        ci_lows = []
-        ci_highs = []
-
-        for _, row in df.iterrows():
-            n = int(row.get("bets", 0))
-            wins = int(row.get("wins", 0))
-
-            if n == 0:
-                p_values.append(1.0)
-                ci_lows.append(np.nan)
-                ci_highs.append(np.nan)
-                continue
-
-            # Binomial test: null hypothesis is 50% win rate (no edge)
-            try:
-                result = binomtest(wins, n, p=0.5, alternative='greater')
-                p_values.append(result.pvalue)
-            except Exception:
-                p_values.append(1.0)
-
-            # Wilson score confidence interval (more accurate than normal approximation)
-            try:
-                ci_low, ci_high = proportion_confint(wins, n, alpha=1-confidence, method='wilson')
-                ci_lows.append(ci_low)
-                ci_highs.append(ci_high)
-            except Exception:
-                ci_lows.append(np.nan)
-                ci_highs.append(np.nan)
+        zeros = np.zeros(len(df), dtype=np.int64)
+        n = df["bets"].to_numpy(dtype=np.int64) if "bets" in df.columns else zeros
+        wins = df["wins"].to_numpy(dtype=np.int64) if "wins" in df.columns else zeros
+        valid = (n > 0) & (wins >= 0) & (wins <= n)
+        n, wins = n[valid], wins[valid]
+
+        # Binomial test: null hypothesis is 50% win rate (no edge). The exact
+        # one-sided tail P(X >= wins) for every strategy in one call
+        p_values = np.ones(len(df))
+        p_values[valid] = binom.sf(wins - 1, n, 0.5)
+
+        # Wilson score confidence interval (more accurate than normal approximation), closed form
+        z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+        hit_rate = wins / n
+        denom = 1 + z**2 / n
+        center = (hit_rate + z**2 / (2 * n)) / denom
+        half_width = z / denom * np.sqrt(hit_rate * (1 - hit_rate) / n + z**2 / (4 * n**2))
+        ci_lows = np.full(len(df), np.nan)
+        ci_highs = np.full(len(df), np.nan)
+        ci_lows[valid] = center - half_width
+        ci_highs[valid] = center + half_width
 
         df["p_value"] = p_values
         df["hit_rate_ci_low"] = ci_lows
@@ -26,9 +26,9 @@ from feature_engineering import engineer_all_features, get_feature_columns
 
 # Import pf_schema_loader - use relative import for Railway/container, fallback for CLI
 try:
-    from pf_schema_loader import load_pf_dataset
+    from pf_schema_loader import PARTITION_FIELD, load_pf_dataset, open_partitioned_table, partition_dir
 except ImportError:
-    from services.api.pf_schema_loader import load_pf_dataset
+    from services.api.pf_schema_loader import PARTITION_FIELD, load_pf_dataset, open_partitioned_table, partition_dir
 
 
 def _normalise_track(value: pd.Series) -> pd.Series:
@@ -93,6 +93,59 @@ def _ensure_schema_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _stringify_ids(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        if col.endswith("_id"):
+            df[col] = df[col].astype(str)
+    return df
+
+
+def _write_runner_fragments(runners_dir: Path, runners: pd.DataFrame, schema=None) -> None:
+    """Write one immutable Parquet fragment per event date, replacing that day's partition."""
+    import uuid
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    event_dates = pd.to_datetime(runners[PARTITION_FIELD], errors="coerce").dt.normalize()
+    payload = runners.drop(columns=[PARTITION_FIELD])
+    if schema is None:
+        schema = pa.Schema.from_pandas(payload, preserve_index=False)
+    for day, idx in event_dates.groupby(event_dates, dropna=False).groups.items():
+        day_frame = payload.loc[idx]
+        try:
+            table = pa.Table.from_pandas(day_frame, schema=schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError, TypeError):
+            # Every fragment must share the dataset schema: fill missing columns with
+            # nulls and cast the rest, letting a column that cannot be cast raise
+            table = pa.Table.from_pandas(day_frame.reindex(columns=schema.names), preserve_index=False)
+            table = table.cast(schema)
+        day_dir = partition_dir(runners_dir, day)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        stale = list(day_dir.glob("*.parquet"))
+        pq.write_table(table, day_dir / f"part-{uuid.uuid4().hex}.parquet")
+        for path in stale:
+            path.unlink()
+
+
+def _migrate_legacy_runners(runners_path: Path, runners_dir: Path, races_path: Path, meetings_path: Path) -> None:
+    """Split a single-file runners table into per-day fragments (one-off)."""
+    legacy = pd.read_parquet(runners_path)
+    if PARTITION_FIELD not in legacy.columns:
+        # Betfair-built schemas keep event_date on meetings only
+        races = pd.read_parquet(races_path, columns=["race_id", "meeting_id"]) if races_path.exists() else None
+        meetings = pd.read_parquet(meetings_path, columns=["meeting_id", PARTITION_FIELD]) if meetings_path.exists() else None
+        if races is not None and meetings is not None:
+            race_dates = races.merge(meetings, on="meeting_id", how="left").drop_duplicates(subset=["race_id"])
+            legacy[PARTITION_FIELD] = legacy["race_id"].map(race_dates.set_index("race_id")[PARTITION_FIELD])
+        else:
+            legacy[PARTITION_FIELD] = pd.NaT
+    # The single-file table was de-duplicated on runner_id at every append; keep that
+    legacy = _stringify_ids(legacy).drop_duplicates(subset=["runner_id"])
+    _write_runner_fragments(runners_dir, legacy)
+    runners_path.unlink()
+
+
 def append_pf_schema_day(live_df: pd.DataFrame, schema_dir: Path) -> dict:
     """Append a single day's PF live data into a schema directory."""
 
@@ -105,6 +158,7 @@ def append_pf_schema_day(live_df: pd.DataFrame, schema_dir: Path) -> dict:
     meetings_path = schema_dir / "meetings.parquet"
     races_path = schema_dir / "races.parquet"
     runners_path = schema_dir / "runners.parquet"
+    runners_dir = schema_dir / "runners"
     manifest_path = schema_dir / "manifest.json"
 
     # Select columns for meetings, ensuring they exist
@@ -178,21 +232,19 @@ def append_pf_schema_day(live_df: pd.DataFrame, schema_dir: Path) -> dict:
     if "meeting_id" in live_runners.columns:
         live_runners = live_runners.drop(columns=["meeting_id"])
 
-    if runners_path.exists():
-        # Read just the schema to get column names (read first row then get columns)
-        try:
-            import pyarrow.parquet as pq
-            parquet_file = pq.ParquetFile(runners_path)
-            template_cols = parquet_file.schema.names
-        except Exception:
-            # Fallback: read the file and get columns (less efficient but works)
-            template_df = pd.read_parquet(runners_path, engine="pyarrow")
-            template_cols = template_df.columns
-
-        for col in template_cols:
+    if runners_path.exists() and not runners_dir.exists():
+        _migrate_legacy_runners(runners_path, runners_dir, races_path, meetings_path)
+
+    live_runners = live_runners.drop_duplicates(subset=["runner_id"])
+    runner_schema = None
+    if runners_dir.exists():
+        # Align to the existing fragments so every partition shares one schema
+        runner_schema = open_partitioned_table(runners_dir).schema
+        runner_schema = runner_schema.remove(runner_schema.get_field_index(PARTITION_FIELD))
+        for col in runner_schema.names:
             if col not in live_runners.columns:
                 live_runners[col] = np.nan
-        live_runners = live_runners[[col for col in template_cols]]
+        live_runners = live_runners[[*runner_schema.names, PARTITION_FIELD]]
 
     def _combine(path: Path, new_df: pd.DataFrame, subset: list[str]) -> pd.DataFrame:
         if path.exists():
@@ -203,22 +255,24 @@ def append_pf_schema_day(live_df: pd.DataFrame, schema_dir: Path) -> dict:
             combined = new_df.copy()
         for col in subset:
             combined[col] = combined[col].astype(str)
-        for col in combined.columns:
-            if col.endswith("_id"):
-                combined[col] = combined[col].astype(str)
+        _stringify_ids(combined)
         combined.to_parquet(path, index=False)
         return combined
 
     combined_meetings = _combine(meetings_path, live_meetings, ["meeting_id"])
     combined_races = _combine(races_path, live_races, ["race_id"])
-    combined_runners = _combine(runners_path, live_runners, ["runner_id"])
+    # Runners are append-only: write this day's fragment instead of rewriting history
+    _write_runner_fragments(runners_dir, _stringify_ids(live_runners), schema=runner_schema)
+    runners_dataset = open_partitioned_table(runners_dir)
 
     manifest = {
         "source": "services/api/data/processed/ml/betfair_kash_top5.csv.gz",
         "last_updated": datetime.utcnow().isoformat() + "Z",
         "total_meetings": len(combined_meetings),
         "total_races": combined_races["race_id"].nunique(),
-        "total_runners": len(combined_runners),
+        "total_runners": runners_dataset.count_rows(),
+        "runners_layout": f"runners/{PARTITION_FIELD}=YYYY-MM-DD/part-*.parquet",
+        "runner_partitions": len(list(runners_dir.glob(f"{PARTITION_FIELD}=*"))),
     }
     manifest_path.write_text(json.dumps(manifest, indent=2))
 
@@ -3,7 +3,10 @@ from __future__ import annotations
 import json
 import asyncio
 import os
-from datetime import date, datetime
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
@@ -19,6 +22,8 @@ from feature_engineering import engineer_all_features, get_feature_columns
 
 # Enable debug logging with environment variable
 DEBUG_PREDICTIONS = os.getenv("DEBUG_PREDICTIONS", "false").lower() == "true"
+# Request-sized batches (a day's runners) score faster without spinning up OpenMP workers
+PREDICT_NUM_THREADS = int(os.getenv("PREDICT_NUM_THREADS", "1"))
 try:
     from .pf_schema_loader import load_pf_dataset
 except ImportError:  # Fallback for environments running as top-level module
@@ -41,6 +46,8 @@ ACE_SCHEMA_DIR = Path("data/processed/pf_schema_full")
 ACE_STRATEGIES_PATH = Path("configs/strategies_default.json")
 ACE_EXPERIENCE_DIR = Path("data/experiences")
 ACE_MIN_BETS = 30
+SCORE_CACHE_SIZE = 32
+CSV_CATEGORICAL_DTYPES = {"track": "category", "selection_name": "category", "win_result": "category"}
 SYDNEY_TZ = ZoneInfo("Australia/Sydney")
 
 app = FastAPI(title="HorseRacingML API", version="0.1.0")
@@ -56,8 +63,15 @@ app.add_middleware(
 
 # Cache model and dataset at startup
 _cached_model: Optional[Booster] = None
+# (path, mtime) of the artifact _cached_model was loaded from
+_cached_model_stamp: Optional[tuple[str, int]] = None
+_model_lock = threading.Lock()
 _cached_data: Optional[pd.DataFrame] = None
+_cached_playbook: Optional[tuple[int, dict]] = None
 _ace_lock = asyncio.Lock()
+# Scored days keyed by (date, model mtime), least recently used first
+_score_cache: OrderedDict[tuple[date, int], pd.DataFrame] = OrderedDict()
+_score_cache_lock = threading.Lock()
 
 
 @app.on_event("startup")
@@ -65,6 +79,7 @@ async def startup_event():
     """Pre-load model and dataset on startup to avoid first-request timeout"""
     global _cached_model, _cached_data
     print("Loading dataset and model at startup...")
+    _clear_score_cache()
     try:
         # Pre-load dataset
         _load_full_dataset()
@@ -82,14 +97,24 @@ async def startup_event():
         print("Model will be loaded on first request instead.")
 
 
+def _model_version() -> tuple[Booster, int]:
+    """Newest model artifact and its mtime, reloaded whenever a newer or rewritten file appears."""
+    global _cached_model, _cached_model_stamp
+    models = sorted(MODEL_DIR.glob("betfair_kash_top5_model_*.txt"))
+    if not models:
+        raise HTTPException(status_code=500, detail="Model artifact not found. Train the model first.")
+    stamp = (str(models[-1]), models[-1].stat().st_mtime_ns)
+    with _model_lock:
+        if _cached_model is None or _cached_model_stamp != stamp:
+            _cached_model = Booster(model_file=stamp[0])
+            _cached_model_stamp = stamp
+            # Days scored by the previous model are stale now
+            _clear_score_cache()
+        return _cached_model, stamp[1]
+
+
 def _latest_model() -> Booster:
-    global _cached_model
-    if _cached_model is None:
-        models = sorted(MODEL_DIR.glob("betfair_kash_top5_model_*.txt"))
-        if not models:
-            raise HTTPException(status_code=500, detail="Model artifact not found. Train the model first.")
-        _cached_model = Booster(model_file=str(models[-1]))
-    return _cached_model
+    return _model_version()[0]
 
 
 def _load_full_dataset() -> pd.DataFrame:
@@ -101,16 +126,42 @@ def _load_full_dataset() -> pd.DataFrame:
         else:
             if not DATA_PATH.exists():
                 raise HTTPException(status_code=500, detail="Training dataset missing. Run data prep pipeline first.")
-            _cached_data = pd.read_csv(DATA_PATH, low_memory=False)
-            _cached_data["event_date"] = pd.to_datetime(_cached_data["event_date"], errors="coerce")
-            _cached_data = _cached_data.dropna(subset=["event_date"]).copy()
+            # Multithreaded Arrow parser; dates parsed during the read and repeated
+            # label columns stored as categoricals instead of per-row Python strings
+            _cached_data = pd.read_csv(
+                DATA_PATH,
+                engine="pyarrow",
+                parse_dates=["event_date"],
+                dtype=CSV_CATEGORICAL_DTYPES,
+            )
+            if not pd.api.types.is_datetime64_any_dtype(_cached_data["event_date"]):
+                _cached_data["event_date"] = pd.to_datetime(_cached_data["event_date"], errors="coerce")
+            _cached_data = _cached_data.dropna(subset=["event_date"])
+        if not _cached_data["event_date"].is_monotonic_increasing:
+            # Date lookups binary-search this column, so keep the cache ordered by date
+            _cached_data = _cached_data.sort_values("event_date", kind="stable")
     return _cached_data
 
 
-def _load_dataset(target_date: date) -> pd.DataFrame:
+def _slice_dates(df: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
+    """Return rows with start <= event_date <= end from a frame sorted by event_date."""
+    event_dates = df["event_date"].to_numpy()
+    bounds = np.array([start, end + timedelta(days=1)], dtype="datetime64[D]").astype(event_dates.dtype)
+    lo, hi = np.searchsorted(event_dates, bounds, side="left")
+    return df.iloc[lo:hi]
+
+
+@lru_cache(maxsize=8)
+def _subset_for_date(target_date: date, data_id: int) -> pd.DataFrame:
+    """Cached-data rows for one day; data_id ties entries to the loaded frame."""
+    return _slice_dates(_load_full_dataset(), target_date, target_date)
+
+
+def _load_dataset(target_date: date) -> tuple[pd.DataFrame, bool]:
+    """Runners for target_date, and whether they stand in for live PF data that was unavailable."""
     # IMPORTANT: Always try live PF data first to get AI features
     # Cached schema data is Betfair-only and missing PF AI features the model needs
-    from datetime import date as date_type, timedelta
+    from datetime import date as date_type
     today = date_type.today()
 
     # For recent dates (within 30 days), ALWAYS try live PF API first (has all features)
@@ -120,36 +171,39 @@ def _load_dataset(target_date: date) -> pd.DataFrame:
         print(f"[INFO] Loading LIVE PF data for {target_date} ({days_ago} days ago)")
         live_df = load_live_pf_day(target_date)
         if live_df is not None and not live_df.empty:
-            live_df = live_df.copy()
             live_df["event_date"] = pd.to_datetime(live_df["event_date"], errors="coerce")
             print(f"[INFO] Successfully loaded {len(live_df)} runners from PF API")
-            return live_df
+            return live_df, False
         # If live data fails, fall through to cached data
         print(f"[WARN] Live PF data not available for {target_date}, falling back to cached data")
 
     # For older dates (>30 days), use cached historical data
-    df = _load_full_dataset()
-    mask = df["event_date"].dt.date == target_date
-    subset = df.loc[mask]
+    subset = _subset_for_date(target_date, id(_load_full_dataset()))
     if subset.empty:
         # Last resort: try live PF data even for old dates
         print(f"[INFO] No cached data for {target_date}, trying PF API...")
         live_df = load_live_pf_day(target_date)
         if live_df is None or live_df.empty:
             raise HTTPException(status_code=404, detail=f"No runners found on {target_date}")
-        live_df = live_df.copy()
         live_df["event_date"] = pd.to_datetime(live_df["event_date"], errors="coerce")
-        return live_df
-    return subset
+        return live_df, False
+    return subset, days_ago <= 30
 
 
 def _load_playbook() -> dict:
+    global _cached_playbook
     if not PLAYBOOK_PATH.exists():
         raise HTTPException(status_code=404, detail="Playbook artifact not found")
+    # PlaybookCurator replaces the file atomically, so a new mtime means a new playbook
+    mtime_ns = PLAYBOOK_PATH.stat().st_mtime_ns
+    if _cached_playbook is not None and _cached_playbook[0] == mtime_ns:
+        return _cached_playbook[1]
     try:
-        return json.loads(PLAYBOOK_PATH.read_text())
+        playbook = json.loads(PLAYBOOK_PATH.read_text())
     except json.JSONDecodeError as exc:
         raise HTTPException(status_code=500, detail="Playbook artifact is invalid JSON") from exc
+    _cached_playbook = (mtime_ns, playbook)
+    return playbook
 
 
 class AceRunRequest(BaseModel):
@@ -173,6 +227,12 @@ class AceRunResponse(BaseModel):
     schema_runners_added: int
 
 
+@lru_cache(maxsize=2)
+def _model_feature_columns(clean_betfair_only: bool) -> pd.Index:
+    """Feature columns for the given feature set, built once per process."""
+    return pd.Index(get_feature_columns(clean_betfair_only=clean_betfair_only))
+
+
 def _score(df_raw: pd.DataFrame, booster: Booster) -> pd.DataFrame:
     df_feat = engineer_all_features(df_raw)
 
@@ -185,7 +245,8 @@ def _score(df_raw: pd.DataFrame, booster: Booster) -> pd.DataFrame:
     )
 
     # Select feature set based on PF availability
-    feature_cols = [c for c in get_feature_columns(clean_betfair_only=not use_pf_features) if c in df_feat.columns]
+    expected_cols = _model_feature_columns(not use_pf_features)
+    feature_cols = expected_cols[expected_cols.isin(df_feat.columns)]
 
     if DEBUG_PREDICTIONS:
         # Only run expensive logging when debug mode is enabled
@@ -200,7 +261,10 @@ def _score(df_raw: pd.DataFrame, booster: Booster) -> pd.DataFrame:
         print(f"  Using {'PF+Betfair' if use_pf_features else 'Betfair-only'} features ({len(feature_cols)} total)")
 
     # LightGBM with objective='binary' already outputs probabilities (0-1 range)
-    raw_predictions = booster.predict(df_feat[feature_cols])
+    # The model has no pandas categoricals, so hand LightGBM a C-ordered float64
+    # matrix directly instead of letting it convert (and re-lay out) the frame
+    features = np.ascontiguousarray(df_feat[feature_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+    raw_predictions = booster.predict(features, num_threads=PREDICT_NUM_THREADS)
 
     if DEBUG_PREDICTIONS:
         print(f"  Raw predictions: min={raw_predictions.min():.4f}, max={raw_predictions.max():.4f}, mean={raw_predictions.mean():.4f}")
@@ -211,13 +275,13 @@ def _score(df_raw: pd.DataFrame, booster: Booster) -> pd.DataFrame:
     # Solution: Normalize predictions within each race so they sum to 1.0
     race_col_name = "win_market_id" if "win_market_id" in df_feat.columns else ("race_id" if "race_id" in df_feat.columns else None)
     if race_col_name is not None:
-        # Add raw predictions as temporary column
-        df_feat["_raw_prob"] = raw_predictions
+        # Group the raw predictions directly by race key - avoids inserting and then
+        # dropping a temporary column, which rebuilds the engineered frame's blocks
+        raw_series = pd.Series(raw_predictions, index=df_feat.index)
         # Calculate sum per race
-        race_sums = df_feat.groupby(race_col_name)["_raw_prob"].transform("sum")
+        race_sums = raw_series.groupby(df_feat[race_col_name]).transform("sum")
         # Normalize so each race sums to 1.0
-        df_feat["model_prob"] = df_feat["_raw_prob"] / race_sums
-        df_feat.drop(columns=["_raw_prob"], inplace=True)
+        df_feat["model_prob"] = raw_series / race_sums
         if DEBUG_PREDICTIONS:
             print(f"  Normalized predictions: min={df_feat['model_prob'].min():.4f}, max={df_feat['model_prob'].max():.4f}, mean={df_feat['model_prob'].mean():.4f}")
     else:
@@ -230,15 +294,78 @@ def _score(df_raw: pd.DataFrame, booster: Booster) -> pd.DataFrame:
 
     missing_implied = df_feat["implied_prob"].isna()
     if missing_implied.any():
-        field_sizes = df_feat.groupby(["event_date", "win_market_id"])['selection_id'].transform("count")
-        uniform_probs = 1.0 / field_sizes.replace(0, 1)
-        df_feat.loc[missing_implied, "implied_prob"] = uniform_probs[missing_implied]
-        df_feat.loc[missing_implied, "win_odds"] = 1.0 / df_feat.loc[missing_implied, "implied_prob"].replace(0, np.nan)
+        # One count per race, looked up only for the rows that need a fallback
+        race_keys = ["event_date", "win_market_id"]
+        race_field_sizes = df_feat.groupby(race_keys)["selection_id"].count().rename("field_size")
+        field_sizes = (
+            df_feat.loc[missing_implied, race_keys]
+            .join(race_field_sizes, on=race_keys)["field_size"]
+            .to_numpy(dtype=np.float64)
+        )
+        uniform_probs = 1.0 / np.where(field_sizes == 0, 1.0, field_sizes)
+        df_feat.loc[missing_implied, "implied_prob"] = uniform_probs
+        df_feat.loc[missing_implied, "win_odds"] = 1.0 / np.where(uniform_probs == 0, np.nan, uniform_probs)
 
     df_feat["edge"] = df_feat["model_prob"] - df_feat["implied_prob"]
     return df_feat
 
 
+def _clear_score_cache() -> None:
+    with _score_cache_lock:
+        _score_cache.clear()
+
+
+def _scored_day(target_date: date) -> pd.DataFrame:
+    """Score a single day's runners; memoised per (date, model version).
+
+    Today's and future cards are rescored on every request so odds moves and
+    scratchings come through, and a recent day scored from cached data because
+    live PF data was unavailable is not memoised either, so the next request
+    retries the live feed. Callers share the returned frame and must not mutate it.
+    """
+    booster, model_mtime_ns = _model_version()
+    if target_date >= date.today():
+        subset, _ = _load_dataset(target_date)
+        return _score(subset, booster)
+
+    key = (target_date, model_mtime_ns)
+    with _score_cache_lock:
+        scored = _score_cache.get(key)
+        if scored is not None:
+            _score_cache.move_to_end(key)
+            return scored
+
+    subset, live_fallback = _load_dataset(target_date)
+    scored = _score(subset, booster)
+    if not live_fallback:
+        with _score_cache_lock:
+            _score_cache[key] = scored
+            while len(_score_cache) > SCORE_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+    return scored
+
+
+def _top_edge_positions(scored: pd.DataFrame, edge_margin: np.ndarray, top: Optional[int]) -> np.ndarray:
+    """Positions of positive-edge runners ordered by date then edge, capped at `top` per race."""
+    positions = np.flatnonzero(edge_margin > 0)
+    event_dates = scored["event_date"].to_numpy()[positions]
+    positions = positions[np.lexsort((-edge_margin[positions], event_dates))]
+    if not top or positions.size == 0:
+        return positions
+
+    # Rank each runner within its race by counting from the first row of its group
+    race_codes = pd.MultiIndex.from_arrays(
+        [scored["event_date"].to_numpy()[positions], scored["win_market_id"].to_numpy()[positions]]
+    ).factorize()[0]
+    by_race = np.argsort(race_codes, kind="stable")
+    sorted_codes = race_codes[by_race]
+    group_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, sorted_codes.size])
+    ranks = np.empty_like(by_race)
+    ranks[by_race] = np.arange(sorted_codes.size) - np.repeat(group_starts, group_sizes)
+    return positions[ranks < top]
+
+
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
@@ -247,9 +374,7 @@ def health() -> dict:
 @app.get("/races")
 def get_races(date_str: Optional[str] = Query(None, description="YYYY-MM-DD")) -> dict:
     target_date = date.fromisoformat(date_str) if date_str else date.today()
-    subset = _load_dataset(target_date)
-    booster = _latest_model()
-    scored = _score(subset, booster)
+    scored = _scored_day(target_date)
     cols = [
         "event_date",
         "track",
@@ -277,9 +402,7 @@ def get_top_picks(
 ) -> dict:
     """Get the model's top picks for the day with confidence levels and summaries."""
     target_date = date.fromisoformat(date_str) if date_str else date.today()
-    subset = _load_dataset(target_date)
-    booster = _latest_model()
-    scored = _score(subset, booster)
+    scored = _scored_day(target_date)
 
     # Debug: Log probability distribution and feature availability
     print(f"\n[DEBUG] Top Picks for {target_date}:")
@@ -384,22 +507,19 @@ def get_selections(
         start_str, end_str = date_str.split(":")
         start_date = date.fromisoformat(start_str)
         end_date = date.fromisoformat(end_str)
-        df = _load_full_dataset()
-        subset = df[(df["event_date"].dt.date >= start_date) & (df["event_date"].dt.date <= end_date)].copy()
+        # Views are safe here: engineer_all_features copies before adding columns
+        subset = _slice_dates(_load_full_dataset(), start_date, end_date)
         if subset.empty:
             raise HTTPException(status_code=404, detail=f"No runners found between {start_date} and {end_date}")
+        scored = _score(subset, _latest_model())
     else:
         target_date = date.fromisoformat(date_str) if date_str else date.today()
-        subset = _load_dataset(target_date)
-
-    booster = _latest_model()
-    scored = _score(subset, booster)
+        scored = _scored_day(target_date)
 
-    scored["edge_margin"] = scored["model_prob"] - scored["implied_prob"] * margin
-    filtered = scored[scored["edge_margin"] > 0].copy()
-    filtered = filtered.sort_values(["event_date", "edge_margin"], ascending=[True, False])
-    if top:
-        filtered = filtered.groupby(["event_date", "win_market_id"]).head(top).reset_index(drop=True)
+    # Day results are memoised and shared, so the margin is applied to a filtered copy
+    edge_margin = scored["model_prob"].to_numpy() - scored["implied_prob"].to_numpy() * margin
+    positions = _top_edge_positions(scored, edge_margin, top)
+    filtered = scored.iloc[positions].assign(edge_margin=edge_margin[positions]).reset_index(drop=True)
 
     # Apply limit to prevent response size issues
     limited = len(filtered) > limit
@@ -514,6 +634,8 @@ async def run_ace_endpoint(payload: AceRunRequest) -> AceRunResponse:
 
         try:
             schema_stats = append_pf_schema_day(live_df, ACE_SCHEMA_DIR)
+            # The forced refresh replaced the live cache for target_date
+            _clear_score_cache()
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -545,7 +667,8 @@ async def run_ace_endpoint(payload: AceRunRequest) -> AceRunResponse:
         metadata = latest.get("metadata", {})
         global_stats = latest.get("global", {})
 
-        return AceRunResponse(
+        # Fields are already typed by the pipeline; the response_model check still runs on the way out
+        return AceRunResponse.model_construct(
             status="completed",
             message=f"ACE run finished successfully (using yesterday's complete results)",
             target_date=target_date.isoformat(),
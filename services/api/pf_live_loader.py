@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import datetime as dt
 import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -13,6 +15,8 @@ from puntingform_api import PuntingFormClient
 
 CACHE_DIR = Path("services/api/data/live_cache")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Meetings are fetched concurrently; the client still spaces request starts by its throttle
+FORM_FETCH_WORKERS = int(os.getenv("PF_FORM_FETCH_WORKERS", "8"))
 
 
 def _make_win_market_id(meeting_id: str, race_no: int) -> str:
@@ -34,21 +38,20 @@ def _pick_column(frame: pd.DataFrame, *candidates: str) -> Optional[pd.Series]:
     return None
 
 
-def _safe_int(value: object, default: int = 0) -> int:
-    if value is None:
-        return default
-    try:
-        if pd.isna(value):
-            return default
-    except TypeError:
-        pass
+def _lower_text(values: pd.Series) -> pd.Series:
+    """Lower-case a text column with Arrow's vectorised utf8_lower kernel."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
     try:
-        return int(value)
-    except (TypeError, ValueError):
-        try:
-            return int(float(value))
-        except (TypeError, ValueError):
-            return default
+        arrow_values = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arrow_values = pa.array(values.astype(str), from_pandas=True)
+    if not pa.types.is_string(arrow_values.type):
+        arrow_values = arrow_values.cast(pa.string())
+    lowered = pc.utf8_lower(arrow_values).to_pandas()
+    lowered.index = values.index
+    return lowered
 
 
 def load_live_pf_day(target_date: dt.date, *, force: bool = False) -> pd.DataFrame:
@@ -67,113 +70,123 @@ def load_live_pf_day(target_date: dt.date, *, force: bool = False) -> pd.DataFra
     if not meetings:
         return pd.DataFrame()
 
-    frames = []
+    pending = []
     for meeting in meetings:
         meeting_id = str(meeting.get("meetingId") or meeting.get("meeting_id") or "")
         if not meeting_id:
             continue
         meeting_date = meeting.get("meetingDate") or meeting.get("pf_meetingDate") or target_date.isoformat()
+        pending.append((meeting, meeting_id, meeting_date))
+
+    # Form requests are I/O bound, so overlap them instead of paying one round trip per meeting
+    with ThreadPoolExecutor(max_workers=max(1, FORM_FETCH_WORKERS)) as pool:
+        forms = list(pool.map(lambda request: client.get_form(request[1], request[2]), pending))
+
+    frames = []
+    for (meeting, meeting_id, _), form_df in zip(pending, forms):
         track_info = meeting.get("track") or {}
         track_name = track_info.get("name") if isinstance(track_info, dict) else track_info
         state_code = track_info.get("state") if isinstance(track_info, dict) else None
 
-        form_df = client.get_form(meeting_id, meeting_date)
         if form_df is None or form_df.empty:
             continue
 
-        df = form_df.copy()
-        df["meeting_id"] = meeting_id
-        df["event_date"] = pd.to_datetime(target_date)
+        # Derived columns are collected here and attached with a single assign,
+        # so the PF frame is neither copied up front nor grown column by column
+        derived: dict[str, object] = {
+            "meeting_id": meeting_id,
+            "event_date": pd.to_datetime(target_date),
+        }
 
-        track_series = _pick_column(df, "track", "track_name")
+        track_series = _pick_column(form_df, "track", "track_name")
         if track_series is not None:
-            df["track"] = track_series.fillna(track_name).fillna(track_info)
+            track = track_series.fillna(track_name).fillna(track_info)
         else:
             fallback_track = track_name or track_info
-            df["track"] = fallback_track if fallback_track is not None else ""
+            track = pd.Series(fallback_track if fallback_track is not None else "", index=form_df.index)
+        derived["track"] = track
 
-        state_series = _pick_column(df, "state_code")
-        if state_series is not None:
-            df["state_code"] = state_series.fillna(state_code)
-        else:
-            df["state_code"] = state_code
+        state_series = _pick_column(form_df, "state_code")
+        derived["state_code"] = state_series.fillna(state_code) if state_series is not None else state_code
 
-        race_no_series = _pick_column(df, "race_number", "race_no")
+        race_no_series = _pick_column(form_df, "race_number", "race_no")
         if race_no_series is not None:
-            df["race_no"] = _coerce_float(race_no_series).astype("Int64", copy=False)
+            race_no = _coerce_float(race_no_series).astype("Int64", copy=False)
         else:
-            df["race_no"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+            race_no = pd.Series(pd.NA, index=form_df.index, dtype="Int64")
 
-        if df["race_no"].isna().all() and "race_id" in df.columns:
-            race_times = pd.to_datetime(df.get("race_time"), errors="coerce") if "race_time" in df.columns else None
+        if race_no.isna().all() and "race_id" in form_df.columns:
+            race_times = pd.to_datetime(form_df.get("race_time"), errors="coerce") if "race_time" in form_df.columns else None
             race_lookup = pd.DataFrame({
-                "race_id": df["race_id"],
+                "race_id": form_df["race_id"],
                 "race_time": race_times,
             }).dropna(subset=["race_id"]).drop_duplicates(subset=["race_id"])
             if "race_time" in race_lookup.columns:
                 race_lookup = race_lookup.sort_values("race_time", na_position="last")
             mapping = {rid: idx + 1 for idx, rid in enumerate(race_lookup["race_id"].astype(str))}
-            df["race_no"] = df["race_id"].astype(str).map(mapping).astype("Int64")
+            race_no = form_df["race_id"].astype(str).map(mapping).astype("Int64")
+        derived["race_no"] = race_no
 
-        df["win_market_id"] = df.apply(
-            lambda row: _make_win_market_id(meeting_id, _safe_int(row.get("race_no"))), axis=1
-        )
+        # One digest per distinct race rather than one per runner
+        race_keys = race_no.fillna(0).astype(int)
+        market_ids = {race_key: _make_win_market_id(meeting_id, int(race_key)) for race_key in race_keys.unique()}
+        derived["win_market_id"] = race_keys.map(market_ids)
 
-        selection_name_series = _pick_column(df, "horse_name", "runnerName", "runner_name")
-        if selection_name_series is not None:
-            df["selection_name"] = selection_name_series
-        else:
-            df["selection_name"] = df.index.astype(str)
+        selection_names = _pick_column(form_df, "horse_name", "runnerName", "runner_name")
+        if selection_names is None:
+            selection_names = pd.Series(form_df.index.astype(str), index=form_df.index)
+        derived["selection_name"] = selection_names
 
-        tab_series = _pick_column(df, "tab_no", "tab_number")
+        tab_series = _pick_column(form_df, "tab_no", "tab_number")
         if tab_series is not None:
-            df["tab_number"] = _coerce_float(tab_series).astype("Int64", copy=False)
+            derived["tab_number"] = _coerce_float(tab_series).astype("Int64", copy=False)
         else:
-            df["tab_number"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+            derived["tab_number"] = pd.Series(pd.NA, index=form_df.index, dtype="Int64")
 
-        runner_ids = _pick_column(df, "runner_id")
+        runner_ids = _pick_column(form_df, "runner_id")
         if runner_ids is None:
-            runner_ids = pd.Series([None] * len(df), index=df.index)
-        else:
-            runner_ids = runner_ids.copy()
+            runner_ids = pd.Series([None] * len(form_df), index=form_df.index)
 
-        horse_names = _pick_column(df, "horse_name")
+        horse_names = _pick_column(form_df, "horse_name")
         if horse_names is None:
-            horse_names = pd.Series([None] * len(df), index=df.index)
+            horse_names = pd.Series([None] * len(form_df), index=form_df.index)
 
-        index_fallback = pd.Series(df.index.astype(str), index=df.index)
-        df["selection_id"] = (
-            runner_ids.fillna(horse_names)
-            .fillna(index_fallback)
-            .apply(lambda val: hashlib.sha1(str(val).encode("utf-8")).hexdigest()[:16])
-        )
+        index_fallback = pd.Series(form_df.index.astype(str), index=form_df.index)
+        selection_keys = runner_ids.fillna(horse_names).fillna(index_fallback).astype(str)
+        # Hash each distinct key once and scatter the digests back by position
+        codes, uniques = pd.factorize(selection_keys)
+        digests = np.array([hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] for key in uniques], dtype=object)
+        derived["selection_id"] = digests[codes]
 
         # Map PF AI price into odds placeholders used by feature pipeline
         # Try multiple price fields as fallback
-        pf_ai_price = _coerce_float(df.get("pf_ai_price")).replace({0: np.nan})
+        pf_ai_price = _coerce_float(form_df.get("pf_ai_price")).replace({0: np.nan})
 
         # If pf_ai_price is all null, try other price fields
         if pf_ai_price.isna().all():
             # Try common alternative fields from PuntingForm API
             for alt_field in ["fixed_price", "price", "win_price", "starting_price", "sp"]:
-                if alt_field in df.columns:
-                    alt_price = _coerce_float(df.get(alt_field)).replace({0: np.nan})
+                if alt_field in form_df.columns:
+                    alt_price = _coerce_float(form_df.get(alt_field)).replace({0: np.nan})
                     if not alt_price.isna().all():
                         pf_ai_price = alt_price
                         break
 
         # If still all null, generate placeholder odds from pf_ai_rank if available
-        if pf_ai_price.isna().all() and "pf_ai_rank" in df.columns:
+        if pf_ai_price.isna().all() and "pf_ai_rank" in form_df.columns:
             # Convert rank to approximate odds (rank 1 = 3.0, rank 2 = 5.0, etc)
-            ranks = pd.to_numeric(df.get("pf_ai_rank"), errors="coerce")
+            ranks = pd.to_numeric(form_df.get("pf_ai_rank"), errors="coerce")
             pf_ai_price = 2.0 + (ranks * 1.5)  # Simple linear approximation
 
-        df["win_preplay_last_price_taken"] = pf_ai_price
-        df["win_preplay_max_price_taken"] = pf_ai_price
-        df["win_preplay_min_price_taken"] = pf_ai_price
-        df["win_last_price_taken"] = pf_ai_price
-        df["win_bsp"] = pf_ai_price
-        df["win_odds"] = pf_ai_price
+        for column in [
+            "win_preplay_last_price_taken",
+            "win_preplay_max_price_taken",
+            "win_preplay_min_price_taken",
+            "win_last_price_taken",
+            "win_bsp",
+            "win_odds",
+        ]:
+            derived[column] = pf_ai_price
 
         # Ensure columns expected by downstream pipeline exist
         for column in [
@@ -185,37 +198,25 @@ def load_live_pf_day(target_date: dt.date, *, force: bool = False) -> pd.DataFra
             "value_pct",
             "place_result",
         ]:
-            if column not in df.columns:
-                df[column] = np.nan
-        if "win_result" in df.columns:
-            df["win_result"] = df["win_result"].astype("string").fillna("UNKNOWN")
+            if column not in form_df.columns:
+                derived[column] = np.nan
+        if "win_result" in form_df.columns:
+            derived["win_result"] = form_df["win_result"].astype("string").fillna("UNKNOWN")
         else:
-            df["win_result"] = "UNKNOWN"
+            derived["win_result"] = "UNKNOWN"
 
-        df["track_name_norm"] = df["track"].astype(str).str.lower()
-        df["horse_name_norm"] = df["selection_name"].astype(str).str.lower()
+        derived["track_name_norm"] = _lower_text(track)
+        derived["horse_name_norm"] = _lower_text(selection_names)
 
-        frames.append(df)
+        frames.append(form_df.assign(**derived))
 
     if not frames:
         return pd.DataFrame()
 
+    # Single concat over the per-meeting frames; the columns already carry their
+    # final names, so no rename pass (which would copy every block) is needed
     result = pd.concat(frames, ignore_index=True)
-    result = result.rename(
-        columns={
-            "race_name": "race_name",
-            "distance": "distance",
-            "race_time": "race_time",
-            "pf_score": "pf_score",
-            "neural_rating": "neural_rating",
-            "time_rating": "time_rating",
-            "early_time_rating": "early_time_rating",
-            "late_sectional_rating": "late_sectional_rating",
-            "weight_class_rating": "weight_class_rating",
-            "pf_ai_score": "pf_ai_score",
-            "pf_ai_rank": "pf_ai_rank",
-        }
-    )
-
-    result.to_parquet(cache_path, index=False)
+    # zstd level 1 reads back as fast as snappy while keeping the day cache smaller;
+    # pyarrow dictionary-encodes the repeated track/meeting strings by default
+    result.to_parquet(cache_path, index=False, engine="pyarrow", compression="zstd", compression_level=1)
     return result
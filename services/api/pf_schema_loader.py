@@ -1,21 +1,35 @@
 """Helpers for reading PF-style schema tables produced from Betfair data."""
 from __future__ import annotations
 
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 
 import pandas as pd
 
-# Determine base directory - works in both development and Docker container
-_current_file = Path(__file__).resolve()
-if _current_file.parent.name == "api":  # Development: services/api/
-    REPO_ROOT = _current_file.parents[2]
-    PF_SCHEMA_DIR = REPO_ROOT / "services" / "api" / "data" / "processed" / "pf_schema"
-else:  # Docker container: /app/
-    PF_SCHEMA_DIR = _current_file.parent / "data" / "processed" / "pf_schema"
+
+@lru_cache(maxsize=None)
+def _base_dir() -> Path:
+    """Directory holding ``data/`` - works in both development and Docker container."""
+    current_file = Path(__file__).resolve()
+    if current_file.parent.name == "api":  # Development: services/api/
+        return current_file.parents[2] / "services" / "api"
+    return current_file.parent  # Docker container: /app/
+
+
+PF_SCHEMA_DIR = _base_dir() / "data" / "processed" / "pf_schema"
 
 _TABLE_EXTS = (".parquet", ".csv.gz", ".csv")
 
+# Append-only tables (runners) are stored as immutable per-day fragments under
+# ``<name>/event_date=YYYY-MM-DD/part-<uuid>.parquet`` instead of a single file.
+PARTITION_FIELD = "event_date"
+
+# Columns load_pf_dataset takes from the race and meeting tables
+RACE_COLUMNS = ["race_id", "meeting_id", "win_market_id", "win_market_name", "race_no", "racing_type", "race_type", "distance", "scheduled_start"]
+MEETING_COLUMNS = ["meeting_id", "event_date", "track", "track_name_norm", "state_code"]
+
 
 def _resolve_column(frame: pd.DataFrame, base_name: str) -> None:
     if base_name in frame.columns:
@@ -31,32 +45,208 @@ def _resolve_column(frame: pd.DataFrame, base_name: str) -> None:
     frame.drop(columns=[c for c in candidates if c in frame.columns], inplace=True)
 
 
+def _to_nullable_int(series: pd.Series) -> pd.Series:
+    """Cast to Int64 with one Arrow kernel, falling back to to_numeric coercion."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        values = pc.cast(pa.array(series, from_pandas=True), pa.int64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        # Non-numeric entries present: keep the coerce-to-NA behaviour
+        return pd.to_numeric(series, errors="coerce").astype("Int64")
+    result = values.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    result.index = series.index
+    result.name = series.name
+    return result
+
+
+@lru_cache(maxsize=None)
+def _arrow_string_dtype() -> Optional[pd.StringDtype]:
+    """Arrow-backed string dtype with NaN missing values, matching pandas 3's default ``str``."""
+    try:
+        return pd.StringDtype("pyarrow", na_value=float("nan"))
+    except (TypeError, ImportError):
+        pass
+    try:
+        return pd.StringDtype("pyarrow_numpy")
+    except (ValueError, ImportError):
+        return None
+
+
+def _arrow_backed_strings(frame: pd.DataFrame) -> pd.DataFrame:
+    """Store pure-text object columns in one Arrow buffer instead of a Python object per cell."""
+    dtype = _arrow_string_dtype()
+    if dtype is None:
+        return frame
+    text_cols = [
+        col
+        for col in frame.columns[frame.dtypes == object]
+        if pd.api.types.infer_dtype(frame[col], skipna=True) in ("string", "empty")
+    ]
+    if not text_cols:
+        return frame
+    return frame.astype(dict.fromkeys(text_cols, dtype))
+
+
+def _looks_numeric(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
 def _convert_to_int_or_str(series: pd.Series) -> pd.Series:
-    numeric = pd.to_numeric(series, errors="coerce")
+    # Text ids (e.g. market names) are settled from a small head sample instead of
+    # coercing the whole column; only numeric or ambiguous samples take the full pass
+    if not pd.api.types.is_numeric_dtype(series):
+        sample = series.head(256).dropna().head(32)
+        if len(sample) and not any(_looks_numeric(value) for value in sample):
+            return series.astype(str)
+    numeric = _to_nullable_int(series)
     if numeric.notna().sum() == 0:
         return series.astype(str)
-    return numeric.astype("Int64")
+    return numeric
+
+
+def partition_dir(table_dir: Path, event_date) -> Path:
+    """Return the hive-style partition directory for a single event date."""
+    day = "__HIVE_DEFAULT_PARTITION__" if pd.isna(event_date) else pd.Timestamp(event_date).date().isoformat()
+    return table_dir / f"{PARTITION_FIELD}={day}"
+
 
+def open_partitioned_table(table_dir: Path):
+    """Open a directory of per-day Parquet fragments as a pyarrow dataset."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
 
-def read_table(name: str, base_dir: Path = PF_SCHEMA_DIR) -> pd.DataFrame:
-    """Read a PF schema table with flexible extension support."""
+    partitioning = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.date32())]), flavor="hive")
+    file_format = ds.ParquetFileFormat(
+        default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=True)
+    )
+    return ds.dataset(table_dir, format=file_format, partitioning=partitioning)
+
+
+def _present(columns: Optional[Sequence[str]], available: Sequence[str]) -> Optional[list[str]]:
+    # Requested columns that exist; missing ones are left for the caller's schema checks
+    if columns is None:
+        return None
+    available = set(available)
+    return [col for col in columns if col in available]
+
+
+def _date_filter(column: str, date_range: tuple[date, date]):
+    # Cast to date32 so the bounds compare against date, timestamp and ISO string columns alike
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    start, end = date_range
+    day = ds.field(column).cast(pa.date32())
+    return (day >= pa.scalar(start, pa.date32())) & (day <= pa.scalar(end, pa.date32()))
+
+
+def read_table(
+    name: str,
+    base_dir: Path = PF_SCHEMA_DIR,
+    columns: Optional[Sequence[str]] = None,
+    date_range: Optional[tuple[date, date]] = None,
+    date_column: str = PARTITION_FIELD,
+) -> pd.DataFrame:
+    """Read a PF schema table with flexible extension support.
+
+    When ``columns`` is given only those columns are decoded; any that the table
+    lacks are skipped rather than raising. ``date_range`` keeps rows whose
+    ``date_column`` falls inside the inclusive range and is pushed down to the
+    Parquet reader (partition pruning / row-group statistics). Tables without
+    that column are returned unfiltered.
+    """
+    table_dir = base_dir / name
+    if table_dir.is_dir():
+        dataset = open_partitioned_table(table_dir)
+        names = dataset.schema.names
+        row_filter = _date_filter(date_column, date_range) if date_range and date_column in names else None
+        return dataset.to_table(columns=_present(columns, names), filter=row_filter).to_pandas()
     for ext in _TABLE_EXTS:
         path = base_dir / f"{name}{ext}"
         if path.exists():
             if ext == ".parquet":
-                return pd.read_parquet(path)
-            return pd.read_csv(path, low_memory=False)
+                import pyarrow.parquet as pq
+
+                names = pq.read_schema(path).names
+                row_filter = _date_filter(date_column, date_range) if date_range and date_column in names else None
+                return pd.read_parquet(path, columns=_present(columns, names), filters=row_filter, engine="pyarrow")
+            names = pd.read_csv(path, nrows=0).columns
+            frame = pd.read_csv(path, usecols=_present(columns, names), engine="pyarrow")
+            if date_range and date_column in frame.columns:
+                # No pushdown for CSV; filter once the (pruned) table is in memory
+                days = pd.to_datetime(frame[date_column], errors="coerce").dt.date
+                frame = frame[(days >= date_range[0]) & (days <= date_range[1])]
+            return frame
     raise FileNotFoundError(f"Table {name} not found under {base_dir}")
 
 
-def load_pf_dataset(base_dir: Path = PF_SCHEMA_DIR) -> Optional[pd.DataFrame]:
-    """Return merged runner-level dataset aligned to original Betfair schema."""
+def _table_signature(base_dir: Path) -> tuple[Optional[int], ...]:
+    """Modification stamps of the runners/races/meetings tables under ``base_dir``."""
+    stamps: list[Optional[int]] = []
+    for name in ("runners", "races", "meetings"):
+        table_dir = base_dir / name
+        if table_dir.is_dir():
+            # Appends add a partition directory or replace a part inside one
+            stamps.append(max(p.stat().st_mtime_ns for p in (table_dir, *table_dir.iterdir())))
+            continue
+        for ext in _TABLE_EXTS:
+            path = base_dir / f"{name}{ext}"
+            if path.exists():
+                stamps.append(path.stat().st_mtime_ns)
+                break
+        else:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def pf_dataset_signature(base_dir: Path = PF_SCHEMA_DIR) -> Optional[tuple[Optional[int], ...]]:
+    """Cheap change stamp for what :func:`load_pf_dataset` would read (None without a schema dir)."""
     if not base_dir.exists():
         return None
+    return _table_signature(base_dir)
+
+
+def load_pf_dataset(
+    base_dir: Path = PF_SCHEMA_DIR,
+    date_range: Optional[tuple[date, date]] = None,
+) -> Optional[pd.DataFrame]:
+    """Return merged runner-level dataset aligned to original Betfair schema.
+
+    ``date_range`` (inclusive) limits the load to those event dates. It is pushed
+    into the meetings read and, for partitioned runners, prunes whole day
+    directories. Row-group skipping on meetings works best when the file is
+    written sorted by event_date so the min/max statistics are tight.
+
+    Results are cached per process until any of the tables changes on disk;
+    callers get a shallow copy so adding or replacing columns stays local.
+    """
+    if not base_dir.exists():
+        return None
+    merged = _load_pf_dataset_cached(base_dir, date_range, _table_signature(base_dir))
+    return None if merged is None else merged.copy(deep=False)
+
+
+@lru_cache(maxsize=4)
+def _load_pf_dataset_cached(
+    base_dir: Path,
+    date_range: Optional[tuple[date, date]],
+    signature: tuple[Optional[int], ...],
+) -> Optional[pd.DataFrame]:
+    # Runners carry the model features so are read whole; races/meetings only feed the join
     try:
-        runners = read_table("runners", base_dir)
-        races = read_table("races", base_dir)
-        meetings = read_table("meetings", base_dir)
+        runners = read_table("runners", base_dir, date_range=date_range)
+        races = read_table("races", base_dir, columns=RACE_COLUMNS)
+        meetings = read_table("meetings", base_dir, columns=MEETING_COLUMNS, date_range=date_range)
     except FileNotFoundError:
         return None
 
@@ -65,33 +255,52 @@ def load_pf_dataset(base_dir: Path = PF_SCHEMA_DIR) -> Optional[pd.DataFrame]:
     if "race_id" not in runners.columns:
         raise ValueError(f"runners table missing 'race_id' column. Available: {list(runners.columns)}")
 
-    race_cols_needed = ["race_id", "meeting_id", "win_market_id", "win_market_name", "race_no", "racing_type", "race_type", "distance", "scheduled_start"]
+    race_cols_needed = RACE_COLUMNS
     missing_race_cols = [col for col in race_cols_needed if col not in races.columns]
     if missing_race_cols:
         raise ValueError(f"races table missing columns: {missing_race_cols}. Available: {list(races.columns)}")
 
-    meeting_cols_needed = ["meeting_id", "event_date", "track", "track_name_norm", "state_code"]
+    meeting_cols_needed = MEETING_COLUMNS
     missing_meeting_cols = [col for col in meeting_cols_needed if col not in meetings.columns]
     if missing_meeting_cols:
         raise ValueError(f"meetings table missing columns: {missing_meeting_cols}. Available: {list(meetings.columns)}")
 
-    # Perform the merge
+    # Filter before joining: undated meetings never survive the final dropna, so drop
+    # them (and, when runners carry no date of their own, their races) up front
+    meetings = meetings.assign(event_date=pd.to_datetime(meetings["event_date"], errors="coerce"))
+    meetings = meetings.dropna(subset=["event_date"])
+    join_how = "left"
+    if "event_date" not in runners.columns:
+        races = races[races["meeting_id"].isin(meetings["meeting_id"])]
+        join_how = "inner"
+
+    # Perform the merge. Right-hand keys are unique (the writers dedupe on them), so
+    # join against indexed lookups and let validate enforce that contract
+    # Columns the left side already has are not pulled again, so no _x/_y pairs are
+    # produced and the runner's own value wins (e.g. the partition event_date)
+    race_cols = [col for col in race_cols_needed if col == "race_id" or col not in runners.columns]
     merged = runners.merge(
-        races[race_cols_needed],
-        on="race_id",
-        how="left",
+        races[race_cols].set_index("race_id"),
+        left_on="race_id",
+        right_index=True,
+        how=join_how,
+        validate="m:1",
     )
 
     # Check that merged has meeting_id from races before second merge
     if "meeting_id" not in merged.columns:
         raise ValueError(f"After merging runners+races, 'meeting_id' not found. Merged columns: {list(merged.columns)}")
 
+    meeting_cols = [col for col in meeting_cols_needed if col == "meeting_id" or col not in merged.columns]
     merged = merged.merge(
-        meetings[meeting_cols_needed],
-        on="meeting_id",
-        how="left",
+        meetings[meeting_cols].set_index("meeting_id"),
+        left_on="meeting_id",
+        right_index=True,
+        how=join_how,
+        validate="m:1",
     )
 
+    # Slow path only: suffix pairs can no longer come from the joins above
     for base in [
         "event_date",
         "meeting_id",
@@ -112,12 +321,13 @@ def load_pf_dataset(base_dir: Path = PF_SCHEMA_DIR) -> Optional[pd.DataFrame]:
         merged["track"] = merged["track"].fillna(merged["track_name_norm"].str.title())
 
     merged["win_market_id"] = _convert_to_int_or_str(merged.get("win_market_id"))
-    merged["race_no"] = pd.to_numeric(merged.get("race_no"), errors="coerce").astype("Int64")
+    merged["race_no"] = _to_nullable_int(merged["race_no"])
     if "selection_id" in merged.columns:
         merged["selection_id"] = _convert_to_int_or_str(merged["selection_id"])
     if "tab_number" in merged.columns:
-        merged["tab_number"] = pd.to_numeric(merged.get("tab_number"), errors="coerce").astype("Int64")
+        merged["tab_number"] = _to_nullable_int(merged["tab_number"])
     if "scheduled_start" in merged.columns:
         merged["scheduled_start"] = pd.to_datetime(merged["scheduled_start"], errors="coerce")
 
-    return merged
+    # Done once here so every cached caller shares the compact text columns
+    return _arrow_backed_strings(merged)
@@ -5,13 +5,24 @@
 # - Responses are cached under ./data/raw/puntingform/YYYY_MM/ as JSON.
 
 from __future__ import annotations
-import os, time, json, hashlib, pathlib, datetime as dt, calendar
+import os, time, json, hashlib, pathlib, threading, datetime as dt, calendar
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Dict, Optional, Tuple, Iterable
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # listed in both requirements files; stdlib json covers bare environments
+    orjson = None
 
 DEFAULT_BASE_URL = "https://api.puntingform.com.au"  # v2 API host
 CACHE_ROOT = os.environ.get("PF_CACHE_ROOT", "./data/raw/puntingform")
+# Cache hits are local file reads, so they are probed concurrently; misses still go through the throttle
+CACHE_READ_WORKERS = int(os.environ.get("PF_CACHE_READ_WORKERS", "8"))
 
 def month_key(year: int, month: int) -> str:
     return f"{year:04d}_{month:02d}"
@@ -19,8 +30,84 @@ def month_key(year: int, month: int) -> str:
 def ensure_dir(p: str) -> None:
     pathlib.Path(p).mkdir(parents=True, exist_ok=True)
 
+@lru_cache(maxsize=8192)
+def cache_key_digest(key: str) -> str:
+    # SHA1 is kept so existing cache files keep their names; memoised because the
+    # same params are hashed on every probe
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+
+_CREATED_CACHE_DIRS: set[str] = set()
+
+def ensure_cache_dir(folder: str) -> None:
+    if folder not in _CREATED_CACHE_DIRS:
+        ensure_dir(folder)
+        _CREATED_CACHE_DIRS.add(folder)
+
+def load_json_file(path: str) -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            raw = f.read()
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN literals written by older stdlib dumps
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def dump_json_file(data: Any, path: str) -> None:
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(data)
+        except TypeError:
+            payload = None  # non-str keys or oversized ints: let stdlib handle them
+        if payload is not None:
+            with open(path, "wb") as f:
+                f.write(payload)
+            return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+# Runner feature -> PF payload keys, tried in priority order (plus case/snake variants).
+# Grouping mirrors the Starter tier: identification, base ratings, AI fields, form.
+RUNNER_FEATURE_KEYS: Dict[str, Tuple[str, ...]] = {
+    # Identification
+    "horse_name": ("horse_name", "horseName", "name"),
+    "tab_no": ("tabNo", "tab_no", "number"),
+    "barrier": ("barrier", "barrierNumber", "originalBarrier"),
+    "age": ("age",),
+    "sex": ("sex", "gender"),
+    "weight": ("weight", "handicapWeight", "allocatedWeight"),
+    "jockey": ("jockey", "jockeyName"),
+    "trainer": ("trainer", "trainerName"),
+    # Base Starter ratings (Starter tier expectations)
+    "pf_score": ("pfscore", "pfScore", "pf_score"),
+    "neural_rating": ("neuralRating", "neural_rating"),
+    "time_rating": ("timeRating", "time_rating"),
+    "early_time_rating": ("earlyTimeRating", "early_time_rating"),
+    "late_sectional_rating": ("lateSectionalRating", "late_sectional_rating"),
+    "weight_class_rating": ("weightClassRating", "weight_class_rating"),
+    "combined_weight_time": ("combinedWeightTime", "combined_weight_time"),
+    # AI derived fields
+    "pf_ai_rank": ("pfAIRank", "pf_ai_rank", "aiRank"),
+    "pf_ai_score": ("pfAIScore", "pf_ai_score", "aiScore"),
+    "pf_ai_price": ("pfAIPrice", "pf_ai_price", "aiPrice"),
+    # Form indicators
+    "days_since_last": ("daysSinceLastRun", "days_since_last_run"),
+    "career_wins": ("careerWins", "career_wins"),
+    "career_starts": ("careerStarts", "career_starts"),
+    "career_seconds": ("careerSeconds", "career_seconds"),
+    "career_thirds": ("careerThirds", "career_thirds"),
+    "prize_money": ("prizeMoney", "prize_money", "prizemoney"),
+}
+# Ratings, AI fields and form counts are coerced to float; identification fields are kept as-is
+NUMERIC_RUNNER_FEATURES = frozenset({
+    "pf_score", "neural_rating", "time_rating", "early_time_rating", "late_sectional_rating",
+    "weight_class_rating", "combined_weight_time", "pf_ai_rank", "pf_ai_score", "pf_ai_price",
+    "days_since_last", "career_wins", "career_starts", "career_seconds", "career_thirds", "prize_money",
+})
+
 class PuntingFormClient:
-    def __init__(self, api_key: Optional[str] = None, base_url: str = DEFAULT_BASE_URL, req_per_sec: float = 1.0, timeout: int = 60):
+    def __init__(self, api_key: Optional[str] = None, base_url: str = DEFAULT_BASE_URL, req_per_sec: float = 1.0, timeout: int = 60, session: Optional[requests.Session] = None):
         self.api_key = api_key or os.environ.get("PUNTINGFORM_API_KEY")
         if not self.api_key:
             raise ValueError("Missing API key. Set PUNTINGFORM_API_KEY env var or pass api_key=...")
@@ -28,31 +115,52 @@ class PuntingFormClient:
         self.req_interval = 1.0 / max(0.0001, req_per_sec)
         self.timeout = timeout
         self._last_req_ts = 0.0
+        self._throttle_lock = threading.Lock()
+        # One keep-alive session so repeated calls reuse the TLS connection; retries stay in _get
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+        self.session = session
 
     # ---- Core HTTP with throttle + retry ----
     def _throttle(self) -> None:
-        delta = time.time() - self._last_req_ts
-        if delta < self.req_interval:
-            time.sleep(self.req_interval - delta)
+        # Reserve the next request slot under a lock so concurrent callers stay within the rate
+        with self._throttle_lock:
+            now = time.time()
+            slot = max(now, self._last_req_ts + self.req_interval)
+            self._last_req_ts = slot
+        if slot > now:
+            time.sleep(slot - now)
 
     def _get(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        data, _ = self._conditional_get(endpoint, params)
+        return data
+
+    def _conditional_get(self, endpoint: str, params: Dict[str, Any], etag: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """GET returning (payload, ETag); payload is None when the server answers 304 for ``etag``."""
         self._throttle()
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
         req_params = dict(params or {})
         req_params.setdefault("apiKey", self.api_key)
         # Basic 3-try retry with backoff
         backoff = 1.5
         for attempt in range(3):
             try:
-                resp = requests.get(url, headers=headers, params=req_params, timeout=self.timeout)
-                self._last_req_ts = time.time()
+                resp = self.session.get(url, headers=headers, params=req_params, timeout=self.timeout)
+                if resp.status_code == 304 and etag:
+                    return None, etag
                 if resp.status_code == 200:
                     try:
-                        return resp.json()
+                        return resp.json(), resp.headers.get("ETag")
                     except Exception:
                         # Some endpoints may return CSV; if so, wrap as {"_raw": text}
-                        return {"_raw": resp.text}
+                        return {"_raw": resp.text}, resp.headers.get("ETag")
                 if resp.status_code in (429, 502, 503):
                     time.sleep((attempt + 1) * backoff)
                     continue
@@ -63,7 +171,7 @@ class PuntingFormClient:
                 data.setdefault("statusCode", resp.status_code)
                 if "error" not in data or not data["error"]:
                     data["error"] = f"HTTP {resp.status_code}"
-                return data
+                return data, None
             except requests.RequestException as e:
                 if attempt == 2:
                     raise
@@ -75,19 +183,46 @@ class PuntingFormClient:
         mk = month_key(year, month)
         base = f"{endpoint.strip('/').replace('/', '_')}"
         key = json.dumps(extra or {}, sort_keys=True)
-        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+        digest = cache_key_digest(key)
         folder = os.path.join(CACHE_ROOT, mk)
-        ensure_dir(folder)
+        ensure_cache_dir(folder)
         return os.path.join(folder, f"{base}__{digest}.json")
 
+    def _read_cache(self, endpoint: str, year: int, month: int, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = self._cache_path(endpoint, year, month, params)
+        if not os.path.exists(path):
+            return None
+        return load_json_file(path)
+
+    def _read_cache_many(self, keys: list[Tuple[str, int, int, Dict[str, Any]]]) -> list[Optional[Dict[str, Any]]]:
+        """Probe the cache for several requests at once; None marks a miss."""
+        with ThreadPoolExecutor(max_workers=max(1, CACHE_READ_WORKERS)) as pool:
+            return list(pool.map(lambda key: self._read_cache(*key), keys))
+
     def _cached_get(self, endpoint: str, year: int, month: int, params: Dict[str, Any], force: bool=False) -> Dict[str, Any]:
         path = self._cache_path(endpoint, year, month, params)
-        if (not force) and os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        data = self._get(endpoint, params)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False)
+        if not force:
+            cached = self._read_cache(endpoint, year, month, params)
+            if cached is not None:
+                return cached
+        # The server's ETag sits beside the cached body so forced refreshes can revalidate
+        etag_path = path[: -len(".json")] + ".etag"
+        etag = None
+        if os.path.exists(path) and os.path.exists(etag_path):
+            with open(etag_path, "r", encoding="utf-8") as f:
+                etag = f.read().strip() or None
+        data, new_etag = self._conditional_get(endpoint, params, etag)
+        if data is None:
+            cached = self._read_cache(endpoint, year, month, params)
+            if cached is not None:
+                return cached
+            data, new_etag = self._conditional_get(endpoint, params)
+        dump_json_file(data, path)
+        if new_etag:
+            with open(etag_path, "w", encoding="utf-8") as f:
+                f.write(new_etag)
+        elif os.path.exists(etag_path):
+            os.remove(etag_path)
         return data
 
     def _make_request(self, endpoint: str, params: Dict[str, Any], *, date_hint: Optional[str | dt.date] = None, force: bool = False) -> Dict[str, Any]:
@@ -129,55 +264,23 @@ class PuntingFormClient:
 
     def extract_runner_features(self, runner_json: Dict[str, Any]) -> Dict[str, Any]:
         """Extract flat starter-level features from a PF runner payload."""
+        features = self._raw_runner_features(runner_json)
+        for feature in NUMERIC_RUNNER_FEATURES:
+            features[feature] = safe_number(features[feature])
+        return features
 
-        def safe_get(data: Dict[str, Any], keys: Iterable[str]) -> Any:
-            for key in keys:
-                for variant in self._key_variants(key):
-                    if variant in data:
-                        return self._maybe_from_mapping(data[variant])
-            return None
-
-        def safe_number(value: Any) -> Any:
-            if value in (None, "", "NaN"):
-                return None
-            try:
-                return float(value)
-            except (TypeError, ValueError):
-                return value
-
-        features = {
-            # Identification
-            "horse_name": safe_get(runner_json, ["horse_name", "horseName", "name"]),
-            "tab_no": safe_get(runner_json, ["tabNo", "tab_no", "number"]),
-            "barrier": safe_get(runner_json, ["barrier", "barrierNumber", "originalBarrier"]),
-            "age": safe_get(runner_json, ["age"]),
-            "sex": safe_get(runner_json, ["sex", "gender"]),
-            "weight": safe_get(runner_json, ["weight", "handicapWeight", "allocatedWeight"]),
-            "jockey": safe_get(runner_json, ["jockey", "jockeyName"]),
-            "trainer": safe_get(runner_json, ["trainer", "trainerName"]),
-
-            # Base Starter ratings (Starter tier expectations)
-            "pf_score": safe_number(safe_get(runner_json, ["pfscore", "pfScore", "pf_score"])),
-            "neural_rating": safe_number(safe_get(runner_json, ["neuralRating", "neural_rating"])),
-            "time_rating": safe_number(safe_get(runner_json, ["timeRating", "time_rating"])),
-            "early_time_rating": safe_number(safe_get(runner_json, ["earlyTimeRating", "early_time_rating"])),
-            "late_sectional_rating": safe_number(safe_get(runner_json, ["lateSectionalRating", "late_sectional_rating"])),
-            "weight_class_rating": safe_number(safe_get(runner_json, ["weightClassRating", "weight_class_rating"])),
-            "combined_weight_time": safe_number(safe_get(runner_json, ["combinedWeightTime", "combined_weight_time"])),
-
-            # AI derived fields
-            "pf_ai_rank": safe_number(safe_get(runner_json, ["pfAIRank", "pf_ai_rank", "aiRank"])),
-            "pf_ai_score": safe_number(safe_get(runner_json, ["pfAIScore", "pf_ai_score", "aiScore"])),
-            "pf_ai_price": safe_number(safe_get(runner_json, ["pfAIPrice", "pf_ai_price", "aiPrice"])),
-
-            # Form indicators
-            "days_since_last": safe_number(safe_get(runner_json, ["daysSinceLastRun", "days_since_last_run"])),
-            "career_wins": safe_number(safe_get(runner_json, ["careerWins", "career_wins"])),
-            "career_starts": safe_number(safe_get(runner_json, ["careerStarts", "career_starts"])),
-            "career_seconds": safe_number(safe_get(runner_json, ["careerSeconds", "career_seconds"])),
-            "career_thirds": safe_number(safe_get(runner_json, ["careerThirds", "career_thirds"])),
-            "prize_money": safe_number(safe_get(runner_json, ["prizeMoney", "prize_money", "prizemoney"])),
-        }
+    def _raw_runner_features(self, runner_json: Dict[str, Any]) -> Dict[str, Any]:
+        """Runner features before numeric coercion, which get_form applies per column."""
+        # Single flattened walk: each feature probes its precomputed spellings in
+        # priority order and stops at the first hit
+        features = {}
+        for feature, variants in _RUNNER_KEY_VARIANTS.items():
+            value = None
+            for variant in variants:
+                if variant in runner_json:
+                    value = self._maybe_from_mapping(runner_json[variant])
+                    break
+            features[feature] = value
 
         if features["jockey"] and isinstance(features["jockey"], dict):
             features["jockey"] = self._maybe_from_mapping(features["jockey"])
@@ -208,6 +311,15 @@ class PuntingFormClient:
                 date_hint = dt.date.fromisoformat(str(date_str)[:10])
             except ValueError:
                 pass
+        # Normalised frames are cached next to the raw JSON so warm reads skip the JSON parse
+        frame_path = None
+        if date_hint is not None:
+            json_path = self._cache_path("v2/form/form", date_hint.year, date_hint.month, params)
+            frame_path = json_path[: -len(".json")] + ".parquet"
+            if (not force) and os.path.exists(frame_path) and os.path.exists(json_path) \
+                    and os.path.getmtime(frame_path) >= os.path.getmtime(json_path):
+                return pd.read_parquet(frame_path)
+
         response = self._make_request("v2/form/form", params, date_hint=date_hint, force=force)
 
         if not response:
@@ -217,7 +329,30 @@ class PuntingFormClient:
             return None
 
         # Some responses nest runners under races; others return a flat payload list.
-        runners: list[Dict[str, Any]] = []
+        # Rows are accumulated column-wise and handed to pandas in one go.
+        columns: Dict[str, list] = {}
+        n_rows = 0
+
+        def add_rows(race_meta: Dict[str, Any], runners: list) -> None:
+            nonlocal n_rows
+            # Race fields are shared by every runner in the block, so extend them once
+            for key, value in race_meta.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = [None] * n_rows
+                column.extend([value] * len(runners))
+            for offset, runner in enumerate(runners):
+                for key, value in self._raw_runner_features(runner).items():
+                    column = columns.get(key)
+                    if column is None:
+                        column = columns[key] = [None] * (n_rows + offset)
+                    column.append(value)
+            n_rows += len(runners)
+
+        def pad_columns() -> None:
+            # The two response shapes carry different race fields; fill the gaps
+            for column in columns.values():
+                column.extend([None] * (n_rows - len(column)))
 
         if "races" in response:
             races = response.get("races") or []
@@ -231,9 +366,8 @@ class PuntingFormClient:
                     "track_condition": race.get("trackCondition"),
                     "rail_position": race.get("railPosition"),
                 }
-                for runner in race.get("runners", []):
-                    runner_features = self.extract_runner_features(runner)
-                    runners.append({**race_meta, **runner_features})
+                add_rows(race_meta, race.get("runners") or [])
+            pad_columns()
 
         payload = response.get("payLoad") or response.get("payload")
         if isinstance(payload, list) and payload:
@@ -248,13 +382,21 @@ class PuntingFormClient:
                     "track_condition": runner.get("trackCondition"),
                     "rail_position": runner.get("railPosition"),
                 }
-                runner_features = self.extract_runner_features(runner)
-                runners.append({**race_meta, **runner_features})
+                add_rows(race_meta, [runner])
+            pad_columns()
 
-        if not runners:
+        if not n_rows:
             return None
 
-        df = pd.DataFrame(runners)
+        for feature in NUMERIC_RUNNER_FEATURES.intersection(columns):
+            columns[feature] = coerce_number_column(columns[feature])
+        df = pd.DataFrame(columns)
+        if frame_path is not None:
+            try:
+                df.to_parquet(frame_path, index=False, compression="zstd")
+            except (ValueError, TypeError, ImportError) as exc:
+                # Mixed-type payload columns cannot be stored as parquet; the JSON cache still works
+                print(f"[PF] Skipping frame cache for meeting {meeting_id}: {exc}")
         return df
 
     # ---- Helpers for v2 API ----
@@ -278,19 +420,47 @@ class PuntingFormClient:
         if isinstance(meeting_date, str):
             meeting_date = dt.date.fromisoformat(meeting_date)
         params = {"meetingDate": meeting_date.isoformat()}
+        if force:
+            # A refreshed day invalidates the aggregated month built from it
+            month_path = self._month_meetings_path(meeting_date.year, meeting_date.month)
+            if os.path.exists(month_path):
+                os.remove(month_path)
         return self._cached_get("v2/form/meetingslist", meeting_date.year, meeting_date.month, params, force=force)
 
+    def _month_meetings_path(self, year: int, month: int) -> str:
+        folder = os.path.join(CACHE_ROOT, month_key(year, month))
+        ensure_cache_dir(folder)
+        return os.path.join(folder, "meetings_month.json")
+
     def get_meetings_month(self, year: int, month: int, *, force: bool = False) -> Dict[str, Any]:
+        # Finished months are stored whole, so warm calls are one read instead of one per day
+        month_path = self._month_meetings_path(year, month)
+        if not force and os.path.exists(month_path):
+            return load_json_file(month_path)
+
+        days = self._month_day_iter(year, month)
+        if force:
+            cached: list[Optional[Dict[str, Any]]] = [None] * len(days)
+        else:
+            cached = self._read_cache_many([
+                ("v2/form/meetingslist", day.year, day.month, {"meetingDate": day.isoformat()}) for day in days
+            ])
         meetings: list[Dict[str, Any]] = []
-        for day in self._month_day_iter(year, month):
-            resp = self.meetings_list(day, force=force)
+        complete = days[-1] < dt.date.today()
+        for day, hit in zip(days, cached):
+            resp = hit if hit is not None else self.meetings_list(day, force=force)
             if resp.get("statusCode", 200) != 200:
+                complete = False
                 continue
             payload = resp.get("payLoad") or []
             for meeting in payload:
                 meeting.setdefault("pf_meetingDate", day.isoformat())
             meetings.extend(payload)
-        return {"payLoad": meetings}
+        result = {"payLoad": meetings}
+        # Only months that are over and fetched cleanly are frozen; others keep re-reading days
+        if complete:
+            dump_json_file(result, month_path)
+        return result
 
     def _collect_meeting_payload(
         self,
@@ -303,6 +473,7 @@ class PuntingFormClient:
     ) -> list[Dict[str, Any]]:
         aggregated: list[Dict[str, Any]] = []
         year_hint, month_hint = (year_month or (dt.date.today().year, dt.date.today().month))
+        pending = []
         for meeting in meetings:
             meeting_id = meeting.get("meetingId") or meeting.get("meeting_id")
             if not meeting_id:
@@ -311,7 +482,14 @@ class PuntingFormClient:
             params = {"meetingId": meeting_id}
             if params_extra:
                 params.update(params_extra)
-            resp = self._cached_get(endpoint, year_val, month_val, params, force=force)
+            pending.append((meeting_id, year_val, month_val, meeting_date_iso, params))
+        if force:
+            cached: list[Optional[Dict[str, Any]]] = [None] * len(pending)
+        else:
+            cached = self._read_cache_many([(endpoint, year_val, month_val, params) for _, year_val, month_val, _, params in pending])
+
+        for (meeting_id, year_val, month_val, meeting_date_iso, params), hit in zip(pending, cached):
+            resp = hit if hit is not None else self._cached_get(endpoint, year_val, month_val, params, force=force)
             status = resp.get("statusCode", 200)
             if status != 200:
                 aggregated.append({
@@ -366,14 +544,45 @@ class PuntingFormClient:
         )
         return {"payLoad": payload}
 
+# Every spelling tried for each runner feature, expanded once at import instead of per runner
+_RUNNER_KEY_VARIANTS: Dict[str, Tuple[str, ...]] = {
+    feature: tuple(dict.fromkeys(variant for key in keys for variant in PuntingFormClient._key_variants(key)))
+    for feature, keys in RUNNER_FEATURE_KEYS.items()
+}
+
+
+def safe_number(value: Any) -> Any:
+    if value in (None, "", "NaN"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def coerce_number_column(values: list) -> Any:
+    """safe_number over a whole column: one numpy conversion, per-value only for odd payloads."""
+    try:
+        # JSON numbers, numeric strings and None (-> NaN) convert in one C loop
+        array = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return [safe_number(value) for value in values]
+    if np.isnan(array).all():
+        # Keep all-missing columns as None so the frame dtype matches the per-value path
+        return [safe_number(value) for value in values]
+    return array
+
 # ---- Normalisers for joining with Kaggle/Betfair ----
 import re
+_RE_PUNCT = re.compile(r"[^\w\s]")
+_RE_SPACE = re.compile(r"\s+")
+
 def norm_txt(s: str | None) -> str | None:
     if s is None:
         return None
     s = str(s).lower().strip()
-    s = re.sub(r"[^\w\s]", "", s)
-    s = re.sub(r"\s+", " ", s)
+    s = _RE_PUNCT.sub("", s)
+    s = _RE_SPACE.sub(" ", s)
     return s
 
 def to_event_date(dt_str: str | None, tz: str = "Australia/Sydney") -> str | None:
@@ -40,12 +40,9 @@ print(f"✓ Strategy Version: {strategy.version}")
 print(f"✓ Code Hash: {strategy._compute_code_hash()}")
 
 # Verify edge calculation manually
-expected_edges = []
-for _, row in sample_data.iterrows():
-    fair_odds = 1.0 / row["model_prob"]
-    adjusted_fair_odds = fair_odds / 1.05
-    edge = row["win_odds"] - adjusted_fair_odds
-    expected_edges.append(edge)
+fair_odds = 1.0 / sample_data["model_prob"].to_numpy()
+adjusted_fair_odds = fair_odds / 1.05
+expected_edges = sample_data["win_odds"].to_numpy() - adjusted_fair_odds
 
 print("\nEdge Calculation Verification:")
 print(f"Runner 1: model_prob=0.25, win_odds=5.0")
@@ -68,12 +68,16 @@ KEY_FEATURES = [
     'pf_ai_price',
 ]
 
+# One notna pass over the present key columns
+present = [c for c in KEY_FEATURES if c in form_df.columns]
+coverage = form_df[present].notna().sum(axis=0)
+
 print("\n=== KEY FEATURES: POPULATION ===")
 for feature in KEY_FEATURES:
-    if feature not in form_df.columns:
+    if feature not in coverage.index:
         print(f"✗ {feature:25s}: missing column")
         continue
-    non_null = form_df[feature].notna().sum()
+    non_null = int(coverage[feature])
     pct = 100 * non_null / len(form_df)
     status = "✓" if pct >= 50 else "⚠" if pct > 0 else "✗"
     print(f"{status} {feature:25s}: {non_null:4d} / {len(form_df)} ({pct:5.1f}%)")
@@ -86,18 +90,18 @@ if sample_cols:
 stats_cols = [c for c in ['pf_score', 'neural_rating', 'time_rating', 'pf_ai_score'] if c in form_df.columns]
 if stats_cols:
     print("\n=== RATING STATS ===")
+    stats = form_df[stats_cols].agg(['count', 'min', 'mean', 'max', 'std'])
     for col in stats_cols:
-        series = form_df[col].dropna()
-        if series.empty:
+        if stats.at['count', col] == 0:
             continue
         print(f"\n{col}:")
-        print(f"  Min:  {series.min():.2f}")
-        print(f"  Mean: {series.mean():.2f}")
-        print(f"  Max:  {series.max():.2f}")
-        print(f"  Std:  {series.std():.2f}")
+        print(f"  Min:  {stats.at['min', col]:.2f}")
+        print(f"  Mean: {stats.at['mean', col]:.2f}")
+        print(f"  Max:  {stats.at['max', col]:.2f}")
+        print(f"  Std:  {stats.at['std', col]:.2f}")
 
 print("\n" + "=" * 70)
-if any(col in form_df.columns and form_df[col].notna().sum() > 0 for col in KEY_FEATURES):
+if (coverage > 0).any():
     print("✅ SUCCESS: PF columns extracted (coverage shown above)")
 else:
     print("⚠️  WARNING: PF rating fields are missing or zero coverage")
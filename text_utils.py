@@ -0,0 +1,36 @@
+"""Track and horse name normalisation shared by the PF / Betfair / Kaggle join scripts."""
+from __future__ import annotations
+
+import re
+
+import pandas as pd
+
+_RE_PUNCT = re.compile(r"[^\w\s]")
+_RE_SPACE = re.compile(r"\s+")
+
+# Arrow's regex engine (RE2) reads \w and \s as ASCII only, so spell out the Unicode
+# classes Python's \w / \s match (str.isalnum() plus "_", and str.isspace())
+_WS = r"\s\v\x1c-\x1f\x85\p{Z}"
+_ARROW_PUNCT = rf"[^\p{{L}}\p{{N}}_{_WS}]"
+_ARROW_SPACE = rf"[{_WS}]+"
+
+
+def norm_txt(s):
+    """Lower-case, strip punctuation and collapse whitespace in one name; missing values pass through."""
+    if pd.isna(s):
+        return s
+    s = str(s).lower().strip()
+    s = _RE_PUNCT.sub("", s)
+    s = _RE_SPACE.sub(" ", s)
+    return s
+
+
+def norm_txt_series(s: pd.Series) -> pd.Series:
+    """Column form of norm_txt: one pass through Arrow's string kernels instead of a Python call per row."""
+    return (
+        s.astype("string[pyarrow]")
+        .str.lower()
+        .str.strip()
+        .str.replace(_ARROW_PUNCT, "", regex=True)
+        .str.replace(_ARROW_SPACE, " ", regex=True)
+    )
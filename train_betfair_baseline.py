@@ -1,79 +1,92 @@
 # train_betfair_baseline.py — monthly walk-forward on Betfair-only features with POT/ROI
 import os, re, numpy as np, pandas as pd
-from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import brier_score_loss, log_loss
 import lightgbm as lgb
+from calibration_utils import fit_isotonic, apply_isotonic, binary_log_loss
+from io_utils import atomic_to_csv, load_features
+from walkforward_utils import walk_forward_boosters
 
 IN_PATH = r"data/processed/ml/betfair_features.csv.gz"
 OUT_DIR = r"artifacts"
 os.makedirs(OUT_DIR, exist_ok=True)
 
-df = pd.read_csv(IN_PATH, low_memory=False)
+LGB_PARAMS = dict(objective="binary", learning_rate=0.03, num_leaves=63,
+                  subsample=0.9, colsample_bytree=0.8, random_state=42, verbose=-1)
+
+# keep numeric features
+FEATURES = ["odds","implied_prob","matched","odds_rank","overround"]
+
+df = load_features(IN_PATH, columns=["event_date", "target_win", *FEATURES])
 df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
 df = df[df["event_date"].notna()].copy()
 
-# keep numeric features
-X = df[["odds","implied_prob","matched","odds_rank","overround"]].copy()
-y = df["target_win"].astype(int)
+X = df[FEATURES].copy()
+y = df["target_win"].astype(np.int8)  # 0/1 labels; 1 byte per row
 dates = df["event_date"]
 odds = df["odds"]
 
-months = sorted(dates.dt.to_period("M").astype(str).unique())
+# integer month codes (year*12 + month-1) instead of period strings
+ym = dates.dt.year.to_numpy(dtype=np.int32) * 12 + dates.dt.month.to_numpy(dtype=np.int32) - 1
+month_codes, month_of_row = np.unique(ym, return_inverse=True)
+# row positions of each month, found once; folds index with these instead of
+# re-comparing every row against the test month
+month_sizes = np.bincount(month_of_row)
+month_rows = np.split(np.argsort(month_of_row, kind="stable"), np.cumsum(month_sizes)[:-1])
+months = [f"{code // 12}-{code % 12 + 1:02d}" for code in month_codes]
 print("Months range:", months[:3], "...", months[-3:], "total:", len(months))
 
+# one float32 matrix and Dataset for the whole run; each fold trains on row subsets
+# of it, so the frame is neither re-sliced nor re-binned per fold
+X32 = X.to_numpy(dtype=np.float32)
+full_ds = lgb.Dataset(X32, label=y.to_numpy(), feature_name=[str(c) for c in X.columns],
+                      params=LGB_PARAMS, free_raw_data=False)
+
+# implied probabilities once for every row; folds slice them by position
+odds_np = odds.to_numpy(dtype=float)
+with np.errstate(divide="ignore", invalid="ignore"):
+    implied_np = 1.0/np.where(odds_np > 0, odds_np, np.nan)
+
 records = []
 feat_imp = None
 
-for i in range(6, len(months)):  # need 6 months history before first test
-    tr_months = months[:i]
+# month i-1 is held out for calibration; the booster covers the months before it
+for i, booster in walk_forward_boosters(LGB_PARAMS, full_ds, month_rows, month_sizes, start=6):  # need 6 months history before first test
     te_month  = months[i]
 
-    tr_idx = dates.dt.to_period("M").astype(str).isin(tr_months)
-    te_idx = dates.dt.to_period("M").astype(str).eq(te_month)
+    # walk-forward: train on every month strictly before the test month
+    te_pos   = month_rows[i]
 
-    Xtr, ytr = X[tr_idx], y[tr_idx]
-    Xte, yte = X[te_idx], y[te_idx]
-    odds_te  = odds[te_idx]
+    n_train  = int(month_sizes[:i].sum())
+    yte      = y.iloc[te_pos]
 
-    if len(Xtr)==0 or len(Xte)==0: 
+    if n_train==0 or len(yte)==0: 
         continue
 
-    model = lgb.LGBMClassifier(
-        objective="binary",
-        n_estimators=600,
-        learning_rate=0.03,
-        num_leaves=63,
-        subsample=0.9,
-        colsample_bytree=0.8,
-        random_state=42
-    )
-    model.fit(Xtr, ytr)
-
-    # calibration
-    calib = CalibratedClassifierCV(model, method="isotonic", cv=3)
-    calib.fit(Xtr, ytr)
-    p = pd.Series(calib.predict_proba(Xte)[:,1], index=Xte.index)
+    cal_pos = month_rows[i-1]
+
+    # calibration: one isotonic fit on the held-out month, applied to the same booster
+    calib = fit_isotonic(booster.predict(X32[cal_pos]), y.iloc[cal_pos])
+    p = pd.Series(apply_isotonic(calib, booster.predict(X32[te_pos])), index=yte.index)
 
     # metrics
-    try: brier = brier_score_loss(yte, p)
-    except: brier = np.nan
-    try: ll = log_loss(yte, np.vstack([1-p, p]).T)
-    except: ll = np.nan
+    # (Brier written out; log loss from the shared binary helper, no 2-column stack)
+    yv, pv = yte.to_numpy(dtype=float), p.to_numpy()
+    brier = float(((pv - yv)**2).mean())
+    ll = binary_log_loss(yv, pv)
 
     # value rule: bet when p > 1/odds
-    edge  = p - (1.0/odds_te.replace(0,np.nan))
-    stake = (edge > 0).astype(float)   # 1u per positive edge
-    ret   = (yte*odds_te - 1.0) * stake
-    pot   = (ret.sum()/stake.sum()) if stake.sum()>0 else np.nan
-    n_bet = int(stake.sum())
+    # (plain numpy on the fold's arrays; zero/missing odds have NaN implied prob and never bet)
+    o = odds_np[te_pos]
+    bet = pv > implied_np[te_pos]  # 1u per positive edge
+    n_bet = int(bet.sum())
+    pot   = (yv[bet]*o[bet] - 1.0).sum()/n_bet if n_bet else np.nan
 
-    if feat_imp is None and hasattr(model, "feature_importances_"):
-        feat_imp = pd.Series(model.feature_importances_, index=X.columns).sort_values(ascending=False)
+    if feat_imp is None:
+        feat_imp = pd.Series(booster.feature_importance(), index=X.columns).sort_values(ascending=False)
 
     records.append({
         "test_month": te_month,
-        "n_train": int(len(Xtr)),
-        "n_test": int(len(Xte)),
+        "n_train": n_train,
+        "n_test": int(len(yte)),
         "bets": n_bet,
         "pot": float(pot) if pot==pot else None,
         "brier": float(brier) if brier==brier else None,
@@ -81,9 +94,9 @@ for i in range(6, len(months)):  # need 6 months history before first test
     })
 
 metrics = pd.DataFrame(records)
-metrics.to_csv(os.path.join(OUT_DIR, "betfair_baseline_metrics.csv"), index=False)
+atomic_to_csv(metrics, os.path.join(OUT_DIR, "betfair_baseline_metrics.csv"), index=False)
 if isinstance(feat_imp, pd.Series):
-    feat_imp.to_csv(os.path.join(OUT_DIR, "betfair_feature_importance.csv"))
+    atomic_to_csv(feat_imp, os.path.join(OUT_DIR, "betfair_feature_importance.csv"))
 
 print("Saved:")
 print(" -", os.path.join(OUT_DIR, "betfair_baseline_metrics.csv"))
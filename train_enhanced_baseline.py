@@ -5,20 +5,22 @@ Train model with the 8 new features and compare to baseline.
 Uses same walk-forward validation as original baseline.
 """
 
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import log_loss, brier_score_loss, roc_auc_score
-from sklearn.calibration import CalibratedClassifierCV
+from sklearn.metrics import brier_score_loss, roc_auc_score
 import lightgbm as lgb
+from calibration_utils import fit_isotonic, apply_isotonic, binary_log_loss
+from io_utils import atomic_to_csv, load_features
+from walkforward_utils import walk_forward_boosters
 import warnings
 warnings.filterwarnings('ignore')
 
 # LightGBM parameters (same as baseline)
 LGBM_PARAMS = {
     'objective': 'binary',
-    'n_estimators': 600,
     'learning_rate': 0.03,
     'num_leaves': 63,
     'subsample': 0.9,
@@ -26,6 +28,8 @@ LGBM_PARAMS = {
     'random_state': 42,
     'verbose': -1
 }
+# LightGBM predict threads for each fold's calibration and test scoring, never more than the cores
+FOLD_THREADS = max(1, min(int(os.environ.get("FOLD_THREADS", os.cpu_count() or 1)), os.cpu_count() or 1))
 
 # Enhanced feature set (baseline + 8 new features)
 FEATURES = [
@@ -50,6 +54,58 @@ FEATURES = [
 ]
 
 
+def evaluate_fold(booster, X_all, y_all, odds_all, implied_all, test_rows, cal_rows):
+    """
+    Calibrate one fold's booster on its held-out month and score the test month.
+    Returns (metrics, split importance), with metrics None when no bets are placed.
+    """
+    
+    y_test = y_all[test_rows]
+    
+    # Single isotonic fit on the held-out month, applied to the same booster
+    calibrator = fit_isotonic(booster.predict(X_all[cal_rows], num_threads=FOLD_THREADS), y_all[cal_rows])
+    
+    # Predict
+    probs = apply_isotonic(calibrator, booster.predict(X_all[test_rows], num_threads=FOLD_THREADS))
+    
+    # Betting logic (same as baseline)
+    # Bet when calibrated probability > implied probability
+    test_odds = odds_all[test_rows]
+    value = probs > implied_all[test_rows]
+    n_bets = int(value.sum())
+    
+    if n_bets == 0:
+        return None, None
+    
+    # Calculate returns (flat 1-unit stakes)
+    returns = np.where(
+        y_test[value] == 1,
+        test_odds[value] - 1,  # Win: return odds-1
+        -1  # Lose: -1
+    )
+    
+    # POT calculation
+    pot = returns.mean()  # Average return per bet
+    
+    # Metrics
+    brier = brier_score_loss(y_test, probs)
+    logloss = binary_log_loss(y_test, probs)
+    
+    try:
+        auc = roc_auc_score(y_test, probs)
+    except:
+        auc = np.nan
+    
+    fold_metrics = {
+        'bets': n_bets,
+        'pot': pot,
+        'brier': brier,
+        'logloss': logloss,
+        'auc': auc
+    }
+    return fold_metrics, booster.feature_importance()
+
+
 def walk_forward_validate(df):
     """
     Monthly walk-forward validation with 6-month warm-up.
@@ -63,10 +119,14 @@ def walk_forward_validate(df):
     # Sort by date
     df = df.sort_values('event_date').reset_index(drop=True)
     df['event_date'] = pd.to_datetime(df['event_date'])
-    df['yearmonth'] = df['event_date'].dt.to_period('M')
     
-    # Get unique months
-    months = sorted(df['yearmonth'].unique())
+    # Ordered int16 month code per row (the Period labels are kept only for
+    # reporting), plus the row positions of each month found once so every step
+    # indexes by position instead of re-comparing every row
+    month_of_row, months = pd.factorize(df['event_date'].dt.to_period('M'), sort=True)
+    month_of_row = month_of_row.astype(np.int16)
+    month_sizes = np.bincount(month_of_row)
+    month_rows = np.split(np.argsort(month_of_row, kind='stable'), np.cumsum(month_sizes)[:-1])
     warm_up = 6
     
     print(f"\n📅 Time period: {months[0]} to {months[-1]}")
@@ -74,97 +134,68 @@ def walk_forward_validate(df):
     print(f"   Warm-up: {warm_up} months")
     print(f"   Testing: {len(months) - warm_up} months")
     
-    results = []
-    feature_importance_list = []
+    # One float32 matrix and Dataset for the whole run; each fold trains on row
+    # subsets of it instead of re-slicing and re-binning the frame
+    X_all = df[FEATURES].fillna(0).to_numpy(dtype=np.float32)
+    y_all = df['target_win'].to_numpy(dtype=np.int8)
+    full_ds = lgb.Dataset(
+        X_all,
+        label=y_all,
+        feature_name=FEATURES,
+        params=LGBM_PARAMS,
+        free_raw_data=False
+    )
+    
+    # Implied probabilities for every row once, sliced per fold
+    odds_all = df['odds'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore'):
+        implied_all = 1 / odds_all
     
-    # Walk forward month by month
-    for i in range(warm_up, len(months)):
+    results = []
+    # One row of split counts per tested month, filled in place
+    importance_matrix = np.zeros((max(len(months) - warm_up, 0), len(FEATURES)), dtype=np.int32)
+    importance_months = []
+    
+    # Boosting is inherently sequential (each fold continues the previous
+    # booster), so each fold is scored on the live booster as soon as it is
+    # trained, before the next month is added; nothing is kept per fold.
+    # Same booster schedule as the baseline trainers, except the booster is
+    # extended by one month on every fold (refit_min_share=0)
+    for i, booster in walk_forward_boosters(LGBM_PARAMS, full_ds, month_rows, month_sizes,
+                                            start=warm_up, refit_min_share=0):
         test_month = months[i]
-        train_months = months[:i]
-        
-        # Split data
-        train = df[df['yearmonth'].isin(train_months)]
-        test = df[df['yearmonth'] == test_month]
         
-        if len(test) == 0:
-            continue
-        
-        # Prepare data
-        X_train = train[FEATURES].fillna(0)
-        y_train = train['target_win']
-        
-        X_test = test[FEATURES].fillna(0)
-        y_test = test['target_win']
-        
-        # Train LightGBM with calibration (same as baseline)
-        base_model = lgb.LGBMClassifier(**LGBM_PARAMS)
-        calibrated_model = CalibratedClassifierCV(
-            base_model,
-            method='isotonic',
-            cv=3
+        fold_metrics, importance = evaluate_fold(
+            booster, X_all, y_all, odds_all, implied_all, month_rows[i], month_rows[i - 1]
         )
-        
-        calibrated_model.fit(X_train, y_train)
-        
-        # Predict
-        probs = calibrated_model.predict_proba(X_test)[:, 1]
-        
-        # Betting logic (same as baseline)
-        # Bet when calibrated probability > implied probability
-        test_copy = test.copy()
-        test_copy['model_prob'] = probs
-        test_copy['value'] = probs > (1 / test_copy['odds'])
-        
-        bets = test_copy[test_copy['value']].copy()
-        
-        if len(bets) == 0:
+        if fold_metrics is None:
             continue
         
-        # Calculate returns (flat 1-unit stakes)
-        bets['return'] = np.where(
-            bets['target_win'] == 1,
-            bets['odds'] - 1,  # Win: return odds-1
-            -1  # Lose: -1
-        )
-        
-        # POT calculation
-        pot = bets['return'].mean()  # Average return per bet
-        
-        # Metrics
-        brier = brier_score_loss(y_test, probs)
-        logloss = log_loss(y_test, probs)
-        
-        try:
-            auc = roc_auc_score(y_test, probs)
-        except:
-            auc = np.nan
-        
         # Store results
         results.append({
             'test_month': str(test_month),
-            'n_train': len(train),
-            'n_test': len(test),
-            'bets': len(bets),
-            'pot': pot,
-            'brier': brier,
-            'logloss': logloss,
-            'auc': auc
+            'n_train': int(month_sizes[:i].sum()),
+            'n_test': len(month_rows[i]),
+            **fold_metrics
         })
         
-        # Feature importance (from base model before calibration)
-        base_estimator = calibrated_model.calibrated_classifiers_[0].estimator
-        importance = pd.DataFrame({
-            'feature': FEATURES,
-            'importance': base_estimator.feature_importances_,
-            'month': str(test_month)
-        })
-        feature_importance_list.append(importance)
+        # Feature importance (from booster before calibration)
+        importance_matrix[len(importance_months)] = importance
+        importance_months.append(str(test_month))
         
         # Progress
         if i % 3 == 0:
-            print(f"   {test_month}: {len(bets):,} bets, POT: {pot:+.2%}")
+            print(f"   {test_month}: {fold_metrics['bets']:,} bets, POT: {fold_metrics['pot']:+.2%}")
+    
+    # Long format, month by month (same layout as before)
+    n_months = len(importance_months)
+    feature_importance_df = pd.DataFrame({
+        'feature': np.tile(FEATURES, n_months),
+        'importance': importance_matrix[:n_months].ravel(),
+        'month': np.repeat(importance_months, len(FEATURES))
+    })
     
-    return pd.DataFrame(results), pd.concat(feature_importance_list, ignore_index=True)
+    return pd.DataFrame(results), feature_importance_df
 
 
 def compare_to_baseline(metrics_df, feature_importance_df):
@@ -256,7 +287,7 @@ def main():
         return
     
     print(f"\n📂 Loading: {input_path}")
-    df = pd.read_csv(input_path)
+    df = load_features(input_path)
     print(f"   Rows: {len(df):,}")
     print(f"   Columns: {len(df.columns)}")
     
@@ -284,8 +315,8 @@ def main():
     metrics_path = output_dir / 'enhanced_baseline_metrics.csv'
     importance_path = output_dir / 'enhanced_feature_importance.csv'
     
-    metrics_df.to_csv(metrics_path, index=False)
-    feature_importance_df.to_csv(importance_path, index=False)
+    atomic_to_csv(metrics_df, metrics_path, index=False)
+    atomic_to_csv(feature_importance_df, importance_path, index=False)
     
     print(f"\n💾 Saved artifacts:")
     print(f"   - {metrics_path}")
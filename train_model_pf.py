@@ -1,6 +1,7 @@
 """Train PF-enhanced LightGBM model and log betting metrics."""
 from __future__ import annotations
 
+import hashlib
 import os
 from pathlib import Path
 from datetime import datetime
@@ -8,86 +9,140 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 from lightgbm import LGBMClassifier
-from sklearn.metrics import log_loss, roc_auc_score
+from sklearn.metrics import roc_auc_score
 
+from calibration_utils import binary_log_loss
+import feature_engineering
 from feature_engineering import engineer_all_features, get_feature_columns, print_feature_summary
-from services.api.pf_schema_loader import load_pf_dataset
+from io_utils import load_features
+from services.api.pf_schema_loader import load_pf_dataset, pf_dataset_signature
 
 DATA_PATH = Path("data/processed/ml/betfair_kash_top5.csv.gz")
 ARTIFACT_DIR = Path("artifacts")
 ARTIFACT_DIR.mkdir(exist_ok=True)
 MODEL_DIR = ARTIFACT_DIR / "models"
 MODEL_DIR.mkdir(exist_ok=True)
+FE_CACHE_DIR = ARTIFACT_DIR / "fe_cache"
+FE_CACHE_DIR.mkdir(exist_ok=True)
+FE_CACHE_VERSION = 1  # bump when build_training_frame changes
+# Leave one core free: LightGBM's histogram builds lose to SMT/bandwidth contention
+# when OpenMP grabs every logical CPU
+N_JOBS = max(1, (os.cpu_count() or 2) - 1)
+EVAL_TRAIN = os.environ.get("EVAL_TRAIN", "1") == "1"
+
+
+def build_training_frame() -> tuple[pd.DataFrame, list[str]]:
+    """Steps 1-3 plus the date sort: load, engineer features, derive the target."""
+    print("1. Loading data...")
+    df_raw = load_pf_dataset()
+    source = "pf_schema"
+    if df_raw is None or df_raw.empty:
+        if not DATA_PATH.exists():
+            raise SystemExit(f"❌ Data not found: {DATA_PATH}")
+        df_raw = load_features(DATA_PATH)
+        source = DATA_PATH.name
+    print(f"   Source: {source}")
+    pf_fallback_cols = [
+        "pf_score",
+        "neural_rating",
+        "time_rating",
+        "early_time_rating",
+        "late_sectional_rating",
+        "weight_class_rating",
+        "combined_weight_time",
+        "pf_ai_rank",
+        "pf_ai_score",
+        "pf_ai_price",
+    ]
+    for col in pf_fallback_cols:
+        if col not in df_raw.columns:
+            df_raw[col] = np.nan
+    print(f"   Rows: {len(df_raw)}")
+
+    print("\n2. Engineering features...")
+    df = engineer_all_features(df_raw)
+
+    # USE CLEAN BETFAIR FEATURES ONLY (no biased model_rank or 100% NaN PF features)
+    feature_cols = [col for col in get_feature_columns(clean_betfair_only=True) if col in df.columns]
+    print(f"   ✓ Using CLEAN Betfair features only: {len(feature_cols)}")
+    print(f"   ✓ Excluded: model_rank (68% default), PF features (100% NaN)")
+    print_feature_summary(df, feature_cols)
+
+    print("\n3. Preparing dataset...")
+    # Target based on Betfair win_result column
+    if "win_result" in df.columns:
+        target = df["win_result"].astype(str).str.lower().eq("winner").astype(int)
+    else:
+        raise SystemExit("❌ win_result column missing; cannot derive target")
+
+    df["won"] = target
+
+    rows_with_target = df["won"].notna().sum()
+    print(f"   Rows with target: {rows_with_target}")
+
+    df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
+    df = df.sort_values("event_date").reset_index(drop=True)
+    keep = [col for col in dict.fromkeys([*feature_cols, "event_date", "won", "win_odds"]) if col in df.columns]
+    return df[keep], feature_cols
+
+
+def feature_cache_path() -> Path:
+    """Parquet cache of the engineered frame, keyed on its inputs and the feature code."""
+    parts = [
+        str(FE_CACHE_VERSION),
+        hashlib.sha1(Path(feature_engineering.__file__).read_bytes()).hexdigest(),
+        repr(pf_dataset_signature()),
+        str(DATA_PATH.stat().st_mtime_ns) if DATA_PATH.exists() else "-",
+    ]
+    key = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+    return FE_CACHE_DIR / f"fe_cache_{key}.parquet"
+
 
 print("=" * 70)
 print("TRAINING MODEL WITH PF FEATURES")
 print("=" * 70)
 
-print("1. Loading data...")
-df_raw = load_pf_dataset()
-source = "pf_schema"
-if df_raw is None or df_raw.empty:
-    if not DATA_PATH.exists():
-        raise SystemExit(f"❌ Data not found: {DATA_PATH}")
-    df_raw = pd.read_csv(DATA_PATH)
-    source = DATA_PATH.name
-print(f"   Source: {source}")
-pf_fallback_cols = [
-    "pf_score",
-    "neural_rating",
-    "time_rating",
-    "early_time_rating",
-    "late_sectional_rating",
-    "weight_class_rating",
-    "combined_weight_time",
-    "pf_ai_rank",
-    "pf_ai_score",
-    "pf_ai_price",
-]
-for col in pf_fallback_cols:
-    if col not in df_raw.columns:
-        df_raw[col] = np.nan
-print(f"   Rows: {len(df_raw)}")
-
-print("\n2. Engineering features...")
-df = engineer_all_features(df_raw)
-
-# USE CLEAN BETFAIR FEATURES ONLY (no biased model_rank or 100% NaN PF features)
-feature_cols = [col for col in get_feature_columns(clean_betfair_only=True) if col in df.columns]
-print(f"   ✓ Using CLEAN Betfair features only: {len(feature_cols)}")
-print(f"   ✓ Excluded: model_rank (68% default), PF features (100% NaN)")
-print_feature_summary(df, feature_cols)
-
-print("\n3. Preparing dataset...")
-# Target based on Betfair win_result column
-if "win_result" in df.columns:
-    target = df["win_result"].astype(str).str.lower().eq("winner").astype(int)
+fe_cache = feature_cache_path()
+if fe_cache.exists():
+    # Only hyperparameters changed since the last run: skip loading and feature engineering
+    print("1. Loading data...")
+    df = pd.read_parquet(fe_cache, engine="pyarrow")
+    feature_cols = [col for col in get_feature_columns(clean_betfair_only=True) if col in df.columns]
+    print(f"   Source: {fe_cache} (cached engineered features)")
+    print(f"   Rows: {len(df)} | Features: {len(feature_cols)}")
 else:
-    raise SystemExit("❌ win_result column missing; cannot derive target")
-
-df = df.copy()
-df["won"] = target
-
-rows_with_target = df["won"].notna().sum()
-print(f"   Rows with target: {rows_with_target}")
+    df, feature_cols = build_training_frame()
+    tmp = fe_cache.with_name(f"{fe_cache.name}.{os.getpid()}.tmp")
+    try:
+        df.to_parquet(tmp, index=False, engine="pyarrow", compression="zstd")
+        os.replace(tmp, fe_cache)
+        for stale in FE_CACHE_DIR.glob("fe_cache_*.parquet"):
+            if stale != fe_cache:
+                stale.unlink()
+    except (ValueError, TypeError, ImportError, OSError) as exc:
+        tmp.unlink(missing_ok=True)
+        print(f"   Skipping feature cache: {exc}")
 
 print("\n4. Temporal train/test split...")
-df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
-df = df.sort_values("event_date").reset_index(drop=True)
-
 split_date = df["event_date"].quantile(0.8)
 print(f"   Split date: {split_date.date() if pd.notna(split_date) else 'N/A'}")
 
-train_mask = df["event_date"] < split_date
-test_mask = df["event_date"] >= split_date
+# The frame is date-sorted with undated (NaT) rows last, so both sides are slices:
+# dated rows before split_date train, the remaining dated rows test
+n_dated = int(df["event_date"].notna().sum())
+split_idx = min(int(df["event_date"].searchsorted(split_date, side="left")), n_dated)
+train_rows = slice(0, split_idx)
+test_rows = slice(split_idx, n_dated)
 
 X = df[feature_cols]
 y = df["won"]
 
-X_train = X[train_mask]
-y_train = y[train_mask]
-X_test = X[test_mask]
-y_test = y[test_mask]
+# float32 column-major matrices: LightGBM bins and builds histograms feature by
+# feature, and predictions are made on the same float32 values it was fitted on
+X_train = np.asfortranarray(X.iloc[train_rows].to_numpy(dtype=np.float32, na_value=np.nan))
+y_train = y.iloc[train_rows].to_numpy(dtype=np.int8)
+X_test = np.asfortranarray(X.iloc[test_rows].to_numpy(dtype=np.float32, na_value=np.nan))
+y_test = y.iloc[test_rows].to_numpy(dtype=np.int8)
 
 print(f"   Train rows: {len(X_train)}")
 print(f"   Test rows:  {len(X_test)}")
@@ -103,9 +158,14 @@ model = LGBMClassifier(
     num_leaves=63,
     subsample=0.9,
     colsample_bytree=0.8,
+    # Coarser histograms: fewer bins to build and scan per split, and sparse
+    # tail bins (long-shot odds, huge volumes) are merged instead of split on
+    max_bin=127,
+    min_data_in_bin=100,
     random_state=42,
+    n_jobs=N_JOBS,
 )
-model.fit(X_train, y_train)
+model.fit(X_train, y_train, feature_name=feature_cols)
 print("   ✓ Training complete")
 
 timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
@@ -114,61 +174,70 @@ model.booster_.save_model(model_path)
 print(f"   ✓ Model saved -> {model_path}")
 
 print("\n6. Evaluating model...")
-train_pred = model.predict_proba(X_train)[:, 1]
-test_pred = model.predict_proba(X_test)[:, 1]
-
-train_logloss = log_loss(y_train, train_pred)
-test_logloss = log_loss(y_test, test_pred)
-
+# Straight from the booster: the arrays carry no column names for sklearn's feature-name check
+test_pred = model.booster_.predict(X_test, num_threads=N_JOBS)
+test_logloss = binary_log_loss(y_test, test_pred)
 try:
-    train_auc = roc_auc_score(y_train, train_pred)
     test_auc = roc_auc_score(y_test, test_pred)
 except ValueError:
-    train_auc = np.nan
     test_auc = np.nan
 
+# Scoring the training set is a full extra inference pass; EVAL_TRAIN=0 skips it
+train_logloss = train_auc = np.nan
+if EVAL_TRAIN:
+    train_pred = model.booster_.predict(X_train, num_threads=N_JOBS)
+    train_logloss = binary_log_loss(y_train, train_pred)
+    try:
+        train_auc = roc_auc_score(y_train, train_pred)
+    except ValueError:
+        pass
+
 print(f"   Train LogLoss: {train_logloss:.4f}")
 print(f"   Test LogLoss:  {test_logloss:.4f}")
 print(f"   Train AUC:     {train_auc:.4f}")
 print(f"   Test AUC:      {test_auc:.4f}")
 
 print("\n7. Betting simulation (test set)...")
-results = df.loc[test_mask].copy()
+results = df.iloc[test_rows].copy()
+win_odds = results["win_odds"].to_numpy(dtype=float)
+# Unpriced runners (odds <= 0) get no implied probability, and so never a bet
+implied_prob = np.reciprocal(win_odds, out=np.full_like(win_odds, np.nan), where=win_odds > 0)
+bet_mask = test_pred > implied_prob
 results["model_prob"] = test_pred
-results["implied_prob"] = 1.0 / (results["win_odds"] + 1e-9)
-
-results["bet"] = results["model_prob"] > results["implied_prob"]
-bets = results[results["bet"]].copy()
-results["profit"] = 0.0
-print(f"   Bets placed: {len(bets)}")
+results["implied_prob"] = implied_prob
+results["bet"] = bet_mask
+# Profit straight on the test frame: 0 where no bet, so there is no bets subset to copy
+# and scatter back
+profit = np.where(bet_mask, np.where(results["won"].to_numpy() == 1, win_odds - 1.0, -1.0), 0.0)
+results["profit"] = profit
+n_bets = int(bet_mask.sum())
+print(f"   Bets placed: {n_bets}")
 
-if len(bets):
-    bets["profit"] = np.where(bets["won"] == 1, bets["win_odds"] - 1, -1)
-    pot = bets["profit"].mean()
+if n_bets:
+    pot = profit[bet_mask].mean()
     print(f"   POT: {pot * 100:.2f}%")
-    results.loc[bets.index, "profit"] = bets["profit"]
 else:
     pot = 0.0
     print("   No bets triggered")
 
 print("\n8. Monthly aggregation...")
-results["month"] = results["event_date"].dt.to_period("M").astype(str)
-summary = (
-    results.groupby("month")
-    .apply(
-        lambda grp: pd.Series(
-            {
-                "bets": int(grp["bet"].sum()),
-                "wins": int((grp["bet"] & (grp["won"] == 1)).sum()),
-                "pot_pct": grp.loc[grp["bet"], "profit"].mean() * 100 if grp["bet"].any() else 0.0,
-                "total_staked": float(grp["bet"].sum()),
-                "total_return": float(grp.loc[grp["bet"], "profit"].sum()),
-            }
-        )
-    )
-    .reset_index()
+# Every figure is a per-month sum (profit is already 0 on rows without a bet), so
+# factorise the Period months to sorted integer codes and sum per code with bincount;
+# only the summary rows are stringified
+month_codes, months = pd.factorize(results["event_date"].dt.to_period("M"), sort=True)
+win_mask = bet_mask & (results["won"].to_numpy() == 1)
+bets_per_month = np.bincount(month_codes[bet_mask], minlength=len(months))
+total_return = np.bincount(month_codes, weights=profit, minlength=len(months))
+summary = pd.DataFrame(
+    {
+        "month": months.astype(str),
+        "bets": bets_per_month,
+        "wins": np.bincount(month_codes[win_mask], minlength=len(months)),
+        "pot_pct": np.where(bets_per_month > 0, total_return / np.maximum(bets_per_month, 1) * 100, 0.0),
+        "total_staked": bets_per_month.astype(float),
+        "total_return": total_return,
+    }
 )
-summary["pot_pct"] = summary["pot_pct"].fillna(0)
 
 art_path = ARTIFACT_DIR / "pf_enhanced_results.csv"
 summary.to_csv(art_path, index=False)
@@ -188,5 +257,5 @@ print("\n9. Overall summary")
 print("=" * 70)
 print(f"Train AUC: {train_auc:.3f} | Test AUC: {test_auc:.3f}")
 print(f"Train LogLoss: {train_logloss:.3f} | Test LogLoss: {test_logloss:.3f}")
-print(f"Bets placed: {len(bets)} | POT: {pot * 100:.2f}%")
+print(f"Bets placed: {n_bets} | POT: {pot * 100:.2f}%")
 print("=" * 70)
@@ -1,37 +1,140 @@
 # unify_betfair_years.py — build yearly Betfair files from monthly ANZ_Thoroughbreds_YYYY_MM.csv
-import os, re, glob
+import os, re, csv, glob, gzip
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import pandas as pd
 import numpy as np
+from text_utils import norm_txt_series
 
+_RE_WS_DASH = re.compile(r"[\s\-]+")
+_RE_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_RE_ALNUM = re.compile(r"[^a-z0-9]")
+
+# the same few column names come round for every month of every year
+@lru_cache(maxsize=4096)
 def to_snake(name: str) -> str:
-    n = re.sub(r"[\s\-]+", "_", name.strip())
-    n = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", n)
+    n = _RE_WS_DASH.sub("_", name.strip())
+    n = _RE_CAMEL.sub(r"\1_\2", n)
     n = n.replace("__", "_").lower()
     return n
 
 def find_col(cols, target):
-    t = re.sub(r"[^a-z0-9]", "", target.lower())
-    for c in cols:
-        if re.sub(r"[^a-z0-9]", "", c.lower()) == t:
+    t = _RE_ALNUM.sub("", target.lower())
+    normed = [(_RE_ALNUM.sub("", c.lower()), c) for c in cols]
+    for n, c in normed:
+        if n == t:
             return c
-    for c in cols:
-        if t in re.sub(r"[^a-z0-9]", "", c.lower()):
+    for n, c in normed:
+        if t in n:
             return c
     return None
 
-def norm_txt(s):
-    if pd.isna(s):
-        return s
-    s = str(s).lower().strip()
-    s = re.sub(r"[^\w\s]", "", s)
-    s = re.sub(r"\s+", " ", s)
-    return s
+# csv (default) keeps the betfair_all_raw_YYYY.csv.gz files the downstream scripts glob for;
+# parquet writes betfair_all_raw_YYYY.parquet instead (zstd, dictionary-encoded)
+RAW_FORMAT = os.environ.get("BETFAIR_RAW_FORMAT", "csv").lower()
+# months read ahead in parallel; each one in flight is held in memory until it is written
+LOAD_WORKERS = max(1, int(os.environ.get("BETFAIR_LOAD_WORKERS", min(4, os.cpu_count() or 1))))
+# leading bytes of each month the year's column types are inferred from
+SCHEMA_SAMPLE_BYTES = 1 << 20
+
+def sample_types(path):
+    """Column name -> Arrow type, inferred from the first SCHEMA_SAMPLE_BYTES of one monthly file."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
 
-def load_month(path):
     try:
-        df = pd.read_csv(path, low_memory=False)
+        with pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=SCHEMA_SAMPLE_BYTES)) as reader:
+            fields = list(reader.schema)
+    except pa.ArrowInvalid:
+        # unparseable head: take the header and read every column as text
+        return {name: pa.string() for name in csv_header(path)}
+    # date/time columns stay as the raw text, the way pandas reads them (prepare_month
+    # parses market_start_time itself); undecodable bytes are text in another encoding
+    as_text = (pa.types.is_timestamp, pa.types.is_date, pa.types.is_binary)
+    return {f.name: pa.string() if any(is_kind(f.type) for is_kind in as_text) else f.type for f in fields}
+
+def common_type(types):
+    """One Arrow type for a column across months: numbers widen, anything else mixed becomes text."""
+    import pyarrow as pa
+
+    types = [t for t in types if not pa.types.is_null(t)]
+    if not types:
+        return pa.float64()  # empty in every sample; pandas reads such a column as float NaN
+    try:
+        return pa.unify_schemas([pa.schema([("c", t)]) for t in types], promote_options="permissive").field("c").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+
+def year_layout(files):
+    """Resolve the year's column types and final frame layout once, before any month is parsed.
+
+    Returns (column types for the Arrow reader, zero-row frame with the columns and dtypes
+    pd.concat would give the year's prepared months). Every month is read against the same
+    types, so only missing columns and int/float widening need conforming afterwards.
+    """
+    import pyarrow as pa
+
+    sampled = [sample_types(p) for p in files]
+    names = list(dict.fromkeys(name for types in sampled for name in types))
+    column_types = {name: common_type([types[name] for types in sampled if name in types]) for name in names}
+    empty = [
+        prepare_month(pa.schema([(name, column_types[name]) for name in types]).empty_table().to_pandas())
+        for types in sampled
+    ]
+    return column_types, pd.concat(empty, ignore_index=True)
+
+def csv_header(path):
+    with open(path, newline="", encoding="utf8", errors="replace") as fh:
+        return next(csv.reader(fh), [])
+
+def read_month_csv(path, column_types):
+    """Parse one monthly file in a single pass of pyarrow's multi-threaded reader (64 MB blocks)."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    convert_opts = pacsv.ConvertOptions(column_types=column_types)
+    try:
+        table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(block_size=64 << 20),
+                               convert_options=convert_opts)
+    except pa.ArrowInvalid:
+        # invalid UTF-8 in a text column: the file is in another encoding
+        table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(block_size=64 << 20, encoding="latin1"),
+                               convert_options=convert_opts)
+    return table.to_pandas()
+
+def load_month(path, column_types):
+    try:
+        df = read_month_csv(path, column_types)
     except Exception:
-        df = pd.read_csv(path, low_memory=False, encoding="latin1")
+        # a column whose values stop fitting the sampled type part-way through, or rows
+        # Arrow cannot parse at all
+        try:
+            df = pd.read_csv(path, low_memory=False)
+        except Exception:
+            df = pd.read_csv(path, low_memory=False, encoding="latin1")
+    return prepare_month(df)
+
+def conform(df, layout):
+    """Give a prepared month the year's columns and dtypes, as concatenating the year would.
+
+    A column that cannot take the year's dtype without changing its values (a month read by
+    the pandas fallback) is kept as objects instead, which is what concat would upcast to.
+    """
+    df = df.reindex(columns=layout.columns)
+    for col, dtype in layout.dtypes.items():
+        have = df[col]
+        if have.dtype == dtype:
+            continue
+        try:
+            cast = have.astype(dtype)
+            lossless = cast.astype(have.dtype).equals(have)
+        except (ValueError, TypeError, OverflowError):
+            lossless = False
+        df[col] = cast if lossless else have.astype(object)
+    return df
+
+def prepare_month(df):
     df.columns = [to_snake(c) for c in df.columns]
     cols = list(df.columns)
     col_market_id = find_col(cols, "market_id") or "market_id"
@@ -49,27 +152,83 @@ def load_month(path):
     except Exception:
         df["event_date"] = pd.to_datetime(dt).dt.date
     track_source = df[col_track]
-    df["track_name_norm"] = track_source.map(norm_txt)
-    df["horse_name_norm"] = df[col_runner_name].map(norm_txt)
-    df["race_id"] = df[col_market_id].astype("string")
-    df["runner_id"] = df[col_market_id].astype("string") + "_" + df[col_selection_id].astype("string")
+    df["track_name_norm"] = norm_txt_series(track_source)
+    df["horse_name_norm"] = norm_txt_series(df[col_runner_name])
+    # cast the market id once and join in Arrow's string kernels
+    market_ids = df[col_market_id].astype("string[pyarrow]")
+    df["race_id"] = market_ids
+    df["runner_id"] = market_ids.str.cat(df[col_selection_id].astype("string[pyarrow]"), sep="_")
     return df
 
+def write_year(frames, year, out_dir="."):
+    """Write the frames from frames() to the year's output one month at a time."""
+    if RAW_FORMAT == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        out_path = os.path.join(out_dir, f"betfair_all_raw_{year}.parquet")
+        writer = None
+        try:
+            for df in frames():
+                table = pa.Table.from_pandas(df, preserve_index=False, schema=writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema, compression="zstd", use_dictionary=True)
+                writer.write_table(table, row_group_size=512_000)
+            if writer is not None:
+                writer.close()
+                return out_path
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+            print(f"⚠️ {year}: parquet write failed ({exc}); writing CSV instead")
+            if writer is not None:
+                # the file only exists once the first month has been converted
+                writer.close()
+                os.remove(out_path)
+    out_path = os.path.join(out_dir, f"betfair_all_raw_{year}.csv.gz")
+    with gzip.open(out_path, "wt", encoding="utf-8", newline="") as fh:
+        for k, df in enumerate(frames()):
+            df.to_csv(fh, index=False, header=k == 0)
+    return out_path
+
 def build_year(files, year, out_dir="."):
-    parts = [load_month(f) for f in sorted(files)]
-    if not parts:
+    files = sorted(files)
+    if not files:
         return None
-    full = pd.concat(parts, ignore_index=True)
-    out_path = os.path.join(out_dir, f"betfair_all_raw_{year}.csv.gz")
-    full.to_csv(out_path, index=False, compression="gzip")
-    full_dates = pd.to_datetime(full["event_date"], errors="coerce")
+    column_types, layout = year_layout(files)
+    stats = {}
+
+    def frames():
+        """Prepared months in file order, each conformed to the year's layout."""
+        # write_year may start over (parquet falling back to CSV), so count afresh each pass
+        stats.update(nrows=0, races=set(), runners=set(), date_lo=[], date_hi=[])
+
+        def tally(df):
+            stats["nrows"] += len(df)
+            stats["races"].update(df["race_id"].dropna().unique())
+            stats["runners"].update(df["runner_id"].dropna().unique())
+            days = pd.to_datetime(df["event_date"], errors="coerce")
+            stats["date_lo"].append(days.min())
+            stats["date_hi"].append(days.max())
+            return df
+
+        # Up to LOAD_WORKERS months are read and prepared ahead on a thread pool (the
+        # Arrow parse and string kernels release the GIL) and handed over in order, so
+        # peak memory is the months in flight rather than the whole year
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+            pending = deque()
+            for path in files:
+                pending.append(pool.submit(lambda p: conform(load_month(p, column_types), layout), path))
+                if len(pending) >= LOAD_WORKERS:
+                    yield tally(pending.popleft().result())
+            while pending:
+                yield tally(pending.popleft().result())
+
+    out_path = write_year(frames, year, out_dir)
     return (
         out_path,
-        len(full),
-        full["race_id"].nunique(),
-        full["runner_id"].nunique(),
-        str(full_dates.min()),
-        str(full_dates.max()),
+        stats["nrows"],
+        len(stats["races"]),
+        len(stats["runners"]),
+        str(pd.Series(stats["date_lo"]).min()),
+        str(pd.Series(stats["date_hi"]).max()),
     )
 
 if __name__ == "__main__":
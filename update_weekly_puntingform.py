@@ -8,6 +8,7 @@
 
 from __future__ import annotations
 import os, sys, datetime as dt, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from puntingform_api import PuntingFormClient, month_key, CACHE_ROOT, ensure_dir
 from dotenv import load_dotenv
@@ -24,6 +25,12 @@ def env_flag(name: str, default: str = "1") -> bool:
 FETCH_FORM = env_flag("PF_FETCH_FORM", "1")
 FETCH_BENCHMARKS = env_flag("PF_FETCH_BENCHMARKS", "0")
 FETCH_SECTIONALS = env_flag("PF_FETCH_SECTIONALS", "0")
+FORM_FETCH_WORKERS = int(os.environ.get("PF_FORM_FETCH_WORKERS", "8"))
+# csv (default) keeps the YYYY_MM/YYYY_MM__<label>.csv files the merge scripts glob for;
+# parquet writes one hive-partitioned dataset per endpoint, PF_DATASET_ROOT/<label>/pf_month=YYYY_MM/,
+# since meetings, form, benchmarks and sectionals each have their own columns
+OUTPUT_FORMAT = os.environ.get("PF_OUTPUT_FORMAT", "csv").lower()
+PF_DATASET_ROOT = os.path.join(PROC_ROOT, "puntingform_dataset")
 
 def months_covering(days:int=7) -> List[tuple[int,int]]:
     today = dt.date.today()
@@ -39,21 +46,40 @@ def flatten_pf_payload(payload: Dict[str, Any]) -> pd.DataFrame:
     """Make a best-effort DataFrame from a PF response, whether JSON or CSV wrapped."""
     if not payload:
         return pd.DataFrame()
-    if isinstance(payload, dict) and "_raw" in payload:
-        # Try CSV
-        import io
-        return pd.read_csv(io.StringIO(payload["_raw"]))
     if isinstance(payload, dict):
-        # Try common JSON list field names
-        for k in ("payLoad","payload","rows","data","items","sectionals","benchmarks","results"):
-            if k in payload and isinstance(payload[k], list):
-                return pd.DataFrame(payload[k])
+        # PF JSON responses carry their rows under "payLoad"; check that first
+        rows = payload.get("payLoad")
+        if isinstance(rows, list):
+            return pd.DataFrame(rows)
+        if "_raw" in payload:
+            # Try CSV
+            import io
+            return pd.read_csv(io.StringIO(payload["_raw"]))
+        # Try the other common JSON list field names
+        for k in ("payload","rows","data","items","sectionals","benchmarks","results"):
+            rows = payload.get(k)
+            if isinstance(rows, list):
+                return pd.DataFrame(rows)
         # Fallback: one-row dict
         return pd.json_normalize(payload)
     if isinstance(payload, list):
         return pd.DataFrame(payload)
     return pd.DataFrame()
 
+def write_pf_dataset(df: pd.DataFrame, label: str) -> None:
+    """Write one endpoint's month to that endpoint's parquet dataset, replacing the month's partition."""
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+
+    pads.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        os.path.join(PF_DATASET_ROOT, label),
+        format="parquet",
+        partitioning=pads.partitioning(pa.schema([("pf_month", pa.string())]), flavor="hive"),
+        existing_data_behavior="delete_matching",
+        file_options=pads.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
 def update_week(days:int=7, force:bool=False) -> None:
     client = PuntingFormClient()
     months = months_covering(days)
@@ -74,6 +100,7 @@ def update_week(days:int=7, force:bool=False) -> None:
 
         if FETCH_FORM:
             extracted_frames: list[pd.DataFrame] = []
+            pending = []
             for meeting in meetings:
                 meeting_id = meeting.get("meetingId")
                 if not meeting_id:
@@ -84,24 +111,33 @@ def update_week(days:int=7, force:bool=False) -> None:
                     track_name = track.get("name")
                 else:
                     track_name = track
+                pending.append((meeting_id, meeting_date, track_name))
 
+            def fetch_form(request):
+                meeting_id, meeting_date, _ = request
                 try:
-                    form_df = client.get_form(meeting_id, date_str=meeting_date, force=force)
+                    return client.get_form(meeting_id, date_str=meeting_date, force=force)
                 except Exception as exc:
                     print(f"Warning: meeting {meeting_id} form fetch failed -> {exc}")
-                    continue
+                    return None
 
+            # Form requests are I/O bound, so overlap them; the client still spaces
+            # request starts by its throttle and backs off on 429s
+            with ThreadPoolExecutor(max_workers=max(1, FORM_FETCH_WORKERS)) as pool:
+                forms = list(pool.map(fetch_form, pending))
+
+            for (_, meeting_date, track_name), form_df in zip(pending, forms):
                 if form_df is None or form_df.empty:
                     continue
 
-                form_df["meeting_date"] = meeting_date
-                form_df["track_name"] = track_name
-                form_df["pf_month"] = mk
-                extracted_frames.append(form_df)
+                # One assign per meeting, endpoint tag included, so the concatenated
+                # frame is not grown by a further column insert afterwards
+                extracted_frames.append(form_df.assign(
+                    meeting_date=meeting_date, track_name=track_name, pf_month=mk, pf_endpoint="form",
+                ))
 
             if extracted_frames:
                 df_form = pd.concat(extracted_frames, ignore_index=True)
-                df_form["pf_endpoint"] = "form"
                 datasets.append(("form", df_form))
                 print(f"Form extractions: {sum(len(f) for f in extracted_frames)} runners across {len(extracted_frames)} meetings")
             else:
@@ -130,11 +166,19 @@ def update_week(days:int=7, force:bool=False) -> None:
                 datasets.append(("sectionals", df_secs))
 
         out_month_dir = os.path.join(PROC_ROOT, "puntingform", mk)
-        ensure_dir(out_month_dir)
         for label, df in datasets:
+            if OUTPUT_FORMAT == "parquet":
+                import pyarrow as pa
+                try:
+                    write_pf_dataset(df, label)
+                    continue
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as exc:
+                    print(f"Warning: {mk} {label} parquet write failed ({exc}); writing CSV instead")
+            ensure_dir(out_month_dir)
             df.to_csv(os.path.join(out_month_dir, f"{mk}__{label}.csv"), index=False)
 
-        print(f"Saved PF month {mk} → {out_month_dir} ({', '.join(name for name, _ in datasets) or 'no datasets'})")
+        out_dest = PF_DATASET_ROOT if OUTPUT_FORMAT == "parquet" else out_month_dir
+        print(f"Saved PF month {mk} → {out_dest} ({', '.join(name for name, _ in datasets) or 'no datasets'})")
 
 if __name__ == "__main__":
     days = int(os.environ.get("PF_UPDATE_DAYS", "7"))
@@ -0,0 +1,39 @@
+"""Warm-started LightGBM boosters for the monthly walk-forward trainers."""
+from __future__ import annotations
+
+import numpy as np
+import lightgbm as lgb
+
+INITIAL_ROUNDS = 600      # first fold is boosted from scratch
+INCREMENTAL_ROUNDS = 50   # later folds continue the booster on the newly added months
+REFIT_MIN_SHARE = 0.02    # skip boosting while the new months add less than this share of training rows
+REFIT_EVERY = 4           # ...but boost at least every this many folds
+
+
+def walk_forward_boosters(params, full_ds: lgb.Dataset, month_rows, month_sizes, start: int = 6,
+                          refit_min_share: float = REFIT_MIN_SHARE, refit_every: int = REFIT_EVERY):
+    """Yield (i, booster) for every test month i from start on.
+
+    Month i-1 is held out for calibration, so the booster covers months before it:
+    trained once on all of them, then extended with the months added since. Late in
+    the series a month is a sliver of the history, so boosting is skipped (the
+    previous booster is yielded again and only recalibrated by the caller) until the
+    pending months reach refit_min_share of the training rows or refit_every folds
+    have passed. refit_min_share=0 boosts on every fold.
+
+    The booster keeps training in place, so score each fold before asking for the next.
+    """
+    booster = None
+    boosted_through = last_fit_i = None  # last month the booster has seen, fold of the last boost
+    for i in range(start, len(month_rows)):
+        if booster is None:
+            booster = lgb.train(params, full_ds.subset(np.sort(np.concatenate(month_rows[:i - 1]))),
+                                num_boost_round=INITIAL_ROUNDS, keep_training_booster=True)
+            boosted_through, last_fit_i = i - 2, i
+        else:
+            new_share = month_sizes[boosted_through + 1:i - 1].sum() / month_sizes[:i - 1].sum()
+            if new_share >= refit_min_share or i - last_fit_i >= refit_every:
+                booster = lgb.train(params, full_ds.subset(np.sort(np.concatenate(month_rows[boosted_through + 1:i - 1]))),
+                                    num_boost_round=INCREMENTAL_ROUNDS, init_model=booster, keep_training_booster=True)
+                boosted_through, last_fit_i = i - 2, i
+        yield i, booster